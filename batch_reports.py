@@ -0,0 +1,132 @@
+"""
+Génération des rapports V0 par client, sans interface Streamlit.
+
+Une seule requête est exécutée par période ; le résultat est découpé par client en mémoire
+puis chaque rapport (KPIs, pivots, données) est écrit en Excel dans un pool de processus.
+
+Exemple :
+    python batch_reports.py --start 2025-03-01 --end 2025-03-31 --output-dir rapports/
+"""
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, time, timedelta
+
+import pandas as pd
+from queries import build_main_query
+from kpis import compute_kpis
+from pivots import pivot_source_by_day, pivot_lead_freshness, pivot_status_by_source
+from utils import nettoyer_nom_campagne, formater_duree
+
+HIDDEN_COLUMNS = ["stat_id", "currency", "firstname", "lastname", "city", "registration_created_at"]
+
+def fetch_period(database_url, start_date, end_date, client_names=None):
+    clauses = ["s.lead_created_at BETWEEN :start_date AND :end_date"]
+    # La date de fin est incluse en entier
+    params = {"start_date": start_date, "end_date": datetime.combine(end_date, time.max)}
+    if client_names:
+        clauses.append("cl.name = ANY(:clients)")
+        params["clients"] = list(client_names)
+
+    from config import get_engine
+
+    engine = get_engine(database_url)
+    try:
+        with engine.connect() as conn:
+            df = pd.read_sql(build_main_query(" AND ".join(clauses)), conn, params=params)
+    finally:
+        engine.dispose()
+
+    df["campaign_name"] = [
+        nettoyer_nom_campagne(nom, vertical) for nom, vertical in zip(df["campaign_name"], df["vertical_name"])
+    ]
+    return df
+
+def _nom_fichier(client_name):
+    return re.sub(r"[^\w\-]+", "_", client_name).strip("_") or "client"
+
+def _noms_fichiers(client_names):
+    """Nom de fichier unique par client : "A/B" et "A B" donneraient tous deux `A_B`, d'où un suffixe."""
+    noms, pris = {}, set()
+    for client_name in client_names:
+        nom, suffixe = _nom_fichier(client_name), 2
+        while nom.lower() in pris:
+            nom = f"{_nom_fichier(client_name)}_{suffixe}"
+            suffixe += 1
+        pris.add(nom.lower())
+        noms[client_name] = nom
+    return noms
+
+def write_client_report(client_name, file_stem, df, start_date, end_date, output_dir):
+    """
+    Écrit le rapport Excel d'un client et renvoie sa ligne de synthèse.
+    Exécuté dans un processus du pool : ne dépend ni de Streamlit ni de la base.
+    """
+    kpis = compute_kpis(df)
+    summary = {
+        "client": client_name,
+        "total_leads": kpis["total_leads"],
+        "total_revenue": kpis["total_revenue"],
+        "avg_price": kpis["avg_price"],
+        "unique_sources": kpis["unique_sources"],
+        "avg_heat": formater_duree(kpis["avg_heat"]),
+    }
+
+    path = os.path.join(output_dir, f"{file_stem}_{start_date}_{end_date}.xlsx")
+    with pd.ExcelWriter(path, engine="xlsxwriter") as writer:
+        pd.DataFrame([summary]).to_excel(writer, sheet_name="KPIs", index=False)
+        pivot_source_by_day(df).reset_index().to_excel(writer, sheet_name="Source par jour", index=False)
+        pivot_lead_freshness(df).reset_index().to_excel(writer, sheet_name="Fraîcheur", index=False)
+        pivot_status_by_source(df).reset_index().to_excel(writer, sheet_name="Statuts par source", index=False)
+        df.drop(columns=HIDDEN_COLUMNS + ["lead_heat_minutes", "jour", "source", "delai", "catégorie", "statut"],
+                errors="ignore").to_excel(writer, sheet_name="Données", index=False)
+
+    summary["fichier"] = path
+    return summary
+
+def generate_reports(database_url, start_date, end_date, output_dir, client_names=None, workers=None):
+    os.makedirs(output_dir, exist_ok=True)
+    df = fetch_period(database_url, start_date, end_date, client_names)
+    df["client_name"] = df["client_name"].fillna("Sans client")
+
+    groups = df.groupby("client_name", sort=True)
+    file_stems = _noms_fichiers(client_name for client_name, _ in groups)
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(write_client_report, client_name, file_stems[client_name], client_df.reset_index(drop=True),
+                            start_date, end_date, output_dir): client_name
+            for client_name, client_df in groups
+        }
+        for future in as_completed(futures):
+            try:
+                summaries.append(future.result())
+            except Exception as e:
+                print(f"❌ {futures[future]} : {e}")
+
+    synthese = pd.DataFrame(summaries).sort_values("client") if summaries else pd.DataFrame()
+    if not synthese.empty:
+        synthese.to_excel(os.path.join(output_dir, f"synthese_{start_date}_{end_date}.xlsx"), index=False)
+    return synthese
+
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+def main():
+    yesterday = date.today() - timedelta(days=1)
+    parser = argparse.ArgumentParser(description="Rapports V0 par client (KPIs, pivots, exports Excel).")
+    parser.add_argument("--start", type=_parse_date, default=yesterday.replace(day=1), help="Date de début (AAAA-MM-JJ)")
+    parser.add_argument("--end", type=_parse_date, default=yesterday, help="Date de fin (AAAA-MM-JJ)")
+    parser.add_argument("--clients", nargs="*", help="Noms des clients (tous par défaut)")
+    parser.add_argument("--output-dir", default="rapports", help="Dossier de sortie des fichiers Excel")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus (CPU par défaut)")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"),
+                        help="URL SQLAlchemy (sinon DATABASE_URL, puis .streamlit/secrets.toml)")
+    args = parser.parse_args()
+
+    synthese = generate_reports(args.database_url, args.start, args.end, args.output_dir, args.clients, args.workers)
+    print(f"✅ {len(synthese)} rapports générés dans {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
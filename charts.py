@@ -0,0 +1,95 @@
+import pandas as pd
+import streamlit as st
+
+# Au-delà de ce nombre de points, une série quotidienne est agrégée par semaine puis par mois
+MAX_POINTS = 400
+# Au-delà de ce nombre de points, les courbes passent en traces WebGL
+WEBGL_THRESHOLD = 250
+
+def downsample_series(df, x, agg):
+    """
+    Ramène une série temporelle sous le budget MAX_POINTS en l'agrégeant par semaine, puis par mois.
+
+    Args:
+        df (pd.DataFrame): Série avec une colonne de dates `x`.
+        x (str): Colonne de dates.
+        agg (dict): Agrégation par colonne (ex: {"volume": "sum"}).
+
+    Returns:
+        tuple: (pd.DataFrame, granularité "jour" | "semaine" | "mois")
+    """
+    if len(df) <= MAX_POINTS:
+        return df, "jour"
+    indexed = df.set_index(pd.to_datetime(df[x]))[list(agg)]
+    for freq, granularity in (("W-MON", "semaine"), ("MS", "mois")):
+        resampled = indexed.resample(freq, label="left", closed="left").agg(agg).rename_axis(x).reset_index()
+        if len(resampled) <= MAX_POINTS:
+            break
+    return resampled, granularity
+
+# Les figures sont mises en cache sur l'empreinte de leurs entrées agrégées (hash Streamlit des arguments) :
+# un rerun sans changement de données ne reconstruit aucune figure.
+@st.cache_data(show_spinner=False, max_entries=200)
+def pie_chart(names, values, title):
+    import plotly.express as px
+
+    return px.pie(names=list(names), values=list(values), title=title)
+
+@st.cache_data(show_spinner=False, max_entries=50)
+def gauge_chart(progress, title):
+    import plotly.graph_objects as go
+
+    return go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=progress,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={'text': title},
+        gauge={
+            'axis': {'range': [0, 100]},
+            'bar': {'color': "darkblue"},
+            'steps': [
+                {'range': [0, 50], 'color': "#FFDDDD"},
+                {'range': [50, 80], 'color': "#FFF3B0"},
+                {'range': [80, 100], 'color': "#D2F6C5"},
+            ],
+        }
+    ))
+
+@st.cache_data(show_spinner=False, max_entries=50)
+def horizontal_bar_chart(labels, values, colors, title, xaxis_title, height=320):
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Bar(
+        x=list(values),
+        y=list(labels),
+        orientation='h',
+        text=[f"{v:,}" for v in values],
+        textposition="auto",
+        marker=dict(color=list(colors))
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title=xaxis_title,
+        yaxis=dict(autorange="reversed"),
+        height=height
+    )
+    return fig
+
+@st.cache_data(show_spinner=False, max_entries=50)
+def daily_bar_chart(data, x, y, title, labels, height=300, agg="sum"):
+    import plotly.express as px
+
+    data, granularity = downsample_series(data, x, {y: agg})
+    if granularity != "jour":
+        title = f"{title} (agrégé par {granularity})"
+    return px.bar(data, x=x, y=y, title=title, labels=labels, height=height)
+
+@st.cache_data(show_spinner=False, max_entries=50)
+def daily_line_chart(data, x, y, title, agg="mean"):
+    import plotly.express as px
+
+    data, granularity = downsample_series(data, x, {y: agg})
+    if granularity != "jour":
+        title = f"{title} (agrégé par {granularity})"
+    render_mode = "webgl" if len(data) > WEBGL_THRESHOLD else "auto"
+    return px.line(data, x=x, y=y, title=title, markers=len(data) <= WEBGL_THRESHOLD, render_mode=render_mode)
@@ -0,0 +1,237 @@
+"""
+Contrôle des plans d'exécution des requêtes du dashboard.
+
+Charge des données synthétiques dans un schéma dédié (`plan_check`) d'un Postgres local,
+applique `migrations/001_dashboard_indexes.sql`, puis exécute `EXPLAIN` sur chaque requête
+produite par `queries.py` (V0, page Campagne, pagination, mode live), avec les paramètres
+du cas puis en plan générique (celui que peut réutiliser une requête préparée). Le script échoue
+(code de sortie 1) si un plan lit une grande table en Seq Scan.
+
+Exemple :
+    python check_query_plans.py --database-url postgresql://postgres@localhost:5432/postgres
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.sql import text
+
+from queries import (
+    main_query_sql,
+    build_main_query,
+    build_v0_filters,
+    campaign_query_sql,
+    build_campaign_query,
+    build_top_campaigns_query,
+    build_campaign_names_query,
+    campaign_names_params,
+    build_page_query,
+    GRID_FILTER_COLUMNS,
+    build_count_query,
+    build_live_delta_query,
+    build_status_changes_query,
+    build_comparison_query,
+    prepared_statement,
+    execute_sql,
+)
+
+SCHEMA = "plan_check"
+MIGRATION = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations", "001_dashboard_indexes.sql")
+LARGE_TABLES = {"stat", "registration", "lead", "lead_client_lead_status"}
+
+# Une inscription toutes les 5 minutes à partir de DATA_START
+DATA_START = datetime(2024, 1, 1)
+STEP = timedelta(minutes=5)
+
+SCHEMA_SQL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+SET search_path TO {SCHEMA};
+
+CREATE TABLE client (id serial PRIMARY KEY, name text);
+CREATE TABLE vertical (id serial PRIMARY KEY, name text);
+CREATE TABLE campaign (
+    id serial PRIMARY KEY, name text, status text, vertical_id int,
+    daily_cap int, monthly_cap int
+);
+CREATE TABLE registration (
+    id bigserial PRIMARY KEY, created_at timestamp, firstname text, lastname text,
+    zipcode text, city text, sold_to_exclusive boolean, others text
+);
+CREATE TABLE lead (
+    id bigserial PRIMARY KEY, registration_id bigint, campaign_id int, email text,
+    last_lead_client_status text
+);
+CREATE TABLE stat (
+    id bigserial PRIMARY KEY, registration bigint, client int, aff_id text,
+    price_eur numeric(10, 2), number_of_sales int, currency text, lead_created_at timestamp
+);
+CREATE TABLE lead_client_lead_status (
+    id bigserial PRIMARY KEY, lead_id bigint, status text, created_at timestamp
+);
+"""
+
+DATA_SQL = """
+INSERT INTO client (name) SELECT 'client_' || g FROM generate_series(1, :clients) g;
+INSERT INTO vertical (name) SELECT 'vertical_' || g FROM generate_series(1, 8) g;
+INSERT INTO campaign (name, status, vertical_id, daily_cap, monthly_cap)
+SELECT 'vertical_' || (g % 8 + 1) || ' - campagne ' || g,
+       (ARRAY['enabled', 'paused', 'disabled'])[g % 3 + 1],
+       g % 8 + 1, 50 + g % 100, 1500 + g % 1000
+FROM generate_series(1, :campaigns) g;
+
+INSERT INTO registration (created_at, firstname, lastname, zipcode, city, sold_to_exclusive, others)
+SELECT :data_start + g * interval '5 minutes', 'prénom ' || g, 'nom ' || g,
+       lpad((g % 95 + 1)::text, 2, '0') || '000', 'ville ' || (g % 300), g % 4 = 0,
+       json_build_object('source', 'source_' || (g % 40), 'aff_sub', 'sub_' || (g % 7),
+                         'publisher_id', g % 90)::text
+FROM generate_series(1, :rows) g;
+
+INSERT INTO stat (registration, client, aff_id, price_eur, number_of_sales, currency, lead_created_at)
+SELECT g, g % :clients + 1, 'ad_' || (g % 500), 5 + (g % 40), g % 3, 'EUR',
+       :data_start + g * interval '5 minutes' + (g % 120) * interval '1 minute'
+FROM generate_series(1, :rows) g;
+
+INSERT INTO lead (registration_id, campaign_id, email, last_lead_client_status)
+SELECT g, g % :campaigns + 1, 'lead' || g || '@example.com',
+       (ARRAY['Sale', 'Not Interested', 'Visit'])[g % 3 + 1]
+FROM generate_series(1, :rows) g
+WHERE g % 10 <> 0;
+
+INSERT INTO lead_client_lead_status (lead_id, status, created_at)
+SELECT l.id, s.status, r.created_at + s.offset_
+FROM lead l
+JOIN registration r ON r.id = l.registration_id
+CROSS JOIN (VALUES ('Uncalled', interval '1 hour'), ('Sale', interval '1 day')) AS s(status, offset_);
+"""
+
+def create_synthetic_data(conn, rows, clients, campaigns):
+    for statement in SCHEMA_SQL.split(";"):
+        if statement.strip():
+            conn.execute(text(statement))
+    params = {"rows": rows, "clients": clients, "campaigns": campaigns, "data_start": DATA_START}
+    for statement in DATA_SQL.split(";"):
+        if statement.strip():
+            conn.execute(text(statement), params)
+    # Statistiques à jour sur toutes les tables chargées : les plans ne dépendent pas du passage de l'autovacuum
+    for table in ("client", "vertical", "campaign", "registration", "lead", "stat", "lead_client_lead_status"):
+        conn.exec_driver_sql(f"ANALYZE {table}")
+
+def apply_migration(conn):
+    with open(MIGRATION, encoding="utf-8") as f:
+        sql = "\n".join(line for line in f if not line.lstrip().startswith("--"))
+    for statement in sql.split(";"):
+        if statement.strip():
+            conn.exec_driver_sql(statement)
+
+def query_cases(data_end):
+    """Requêtes à contrôler : (nom, requête SQLAlchemy, paramètres)."""
+    start_date = data_end - timedelta(days=7)
+    no_filter = {"clients": [], "campaigns": [], "verticals": [], "ads": []}
+    v0_selections = {
+        "sans filtre": no_filter,
+        "clients": dict(no_filter, clients=[1, 2]),
+        "campagnes": dict(no_filter, campaigns=[3, 4]),
+        "verticales": dict(no_filter, verticals=["vertical_1"]),
+        "ad ID": dict(no_filter, ads=["ad_1", "ad_2"]),
+    }
+
+    cases = []
+    for label, selections in v0_selections.items():
+        where_clause, params = build_v0_filters(selections, start_date, data_end)
+        cases.append((f"V0 – {label}", build_main_query(where_clause), params))
+
+    where_clause, params = build_v0_filters(no_filter, start_date, data_end)
+    base_sql = main_query_sql(where_clause)
+    grid_params = dict(params, _limit=100, _after_sort=None, _after_id=None, _after_lead_id=None,
+                       **{f"_f_{col}": None for col in GRID_FILTER_COLUMNS})
+    cases.append(("V0 – page 1 (keyset)",
+                  build_page_query(base_sql, "lead_created_at", True, GRID_FILTER_COLUMNS), grid_params))
+    cases.append(("V0 – page suivante (keyset)", build_page_query(base_sql, "lead_created_at", True, GRID_FILTER_COLUMNS),
+                  dict(grid_params, _after_sort=data_end - timedelta(days=1), _after_id=10**9, _after_lead_id=10**9)))
+    cases.append(("V0 – comptage", text(build_count_query(main_query_sql(where_clause, with_last_status=False))), params))
+    cases.append(("Live – delta", build_live_delta_query(where_clause),
+                  dict(params, last_stat_id=10**9, last_lead_created_at=data_end - timedelta(hours=1))))
+    cases.append(("V0 – comparaison (mois précédent)", build_comparison_query(base_sql),
+                  dict(params, current_start=start_date, current_end=data_end,
+                       previous_start=start_date - timedelta(days=30), previous_end=data_end - timedelta(days=30))))
+    cases.append(("Live – statuts", build_status_changes_query(), {"since": data_end - timedelta(hours=1)}))
+
+    campaign_where = "c.name = :campagne AND s.lead_created_at BETWEEN :start_date AND :end_date"
+    campaign_params = {"campagne": "vertical_2 - campagne 1", "start_date": start_date, "end_date": data_end}
+    cases.append(("Campagne – top 10", build_top_campaigns_query(), {"start_date": start_date, "end_date": data_end}))
+    cases.append(("Campagne – liste", build_campaign_names_query(), campaign_names_params(["enabled"])))
+    cases.append(("Campagne – données", build_campaign_query(campaign_where), campaign_params))
+    cases.append(("Campagne – page 1 (keyset)",
+                  build_page_query(campaign_query_sql(campaign_where), "lead_created_at", True, GRID_FILTER_COLUMNS),
+                  dict(campaign_params, _limit=100, _after_sort=None, _after_id=None, _after_lead_id=None,
+                       **{f"_f_{col}": None for col in GRID_FILTER_COLUMNS})))
+    return cases
+
+def find_seq_scans(plan):
+    """Renvoie les grandes tables lues en Seq Scan dans un plan EXPLAIN (FORMAT JSON)."""
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in LARGE_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(find_seq_scans(child))
+    return found
+
+def explain(conn, query, params):
+    return conn.execute(text(f"EXPLAIN (FORMAT JSON) {query.text}"), params).scalar()[0]["Plan"]
+
+def explain_generic(conn, query, params):
+    """Plan générique, celui que Postgres peut réutiliser pour une requête préparée par le dashboard."""
+    statement, positional_sql, names = prepared_statement(query.text)
+    conn.exec_driver_sql(f"PREPARE {statement} AS {positional_sql}")
+    try:
+        conn.exec_driver_sql("SET plan_cache_mode = force_generic_plan")
+        plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {execute_sql(statement, names)}"),
+                            {name: params[name] for name in names}).scalar()[0]["Plan"]
+    finally:
+        conn.exec_driver_sql("RESET plan_cache_mode")
+        conn.exec_driver_sql(f"DEALLOCATE {statement}")
+    return plan
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN des requêtes du dashboard sur des données synthétiques.")
+    parser.add_argument("--database-url", default=os.environ.get("PLAN_CHECK_DATABASE_URL", "postgresql://postgres@localhost:5432/postgres"),
+                        help="Postgres local (seul le schéma plan_check est modifié)")
+    parser.add_argument("--rows", type=int, default=300_000, help="Nombre de leads synthétiques")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--campaigns", type=int, default=150)
+    parser.add_argument("--keep-data", action="store_true", help="Réutiliser le schéma plan_check existant")
+    parser.add_argument("--verbose", action="store_true", help="Afficher le plan des requêtes en échec")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url, isolation_level="AUTOCOMMIT")
+    data_end = DATA_START + STEP * args.rows
+    failures = 0
+    with engine.connect() as conn:
+        if not args.keep_data:
+            print(f"⏳ Chargement de {args.rows:,} leads synthétiques dans le schéma {SCHEMA}...")
+            create_synthetic_data(conn, args.rows, args.clients, args.campaigns)
+        conn.exec_driver_sql(f"SET search_path TO {SCHEMA}")
+        apply_migration(conn)
+
+        for name, query, params in query_cases(data_end):
+            for label, explain_plan in (("", explain), (" (plan générique)", explain_generic)):
+                plan = explain_plan(conn, query, params)
+                seq_scans = sorted(set(find_seq_scans(plan)))
+                if seq_scans:
+                    failures += 1
+                    print(f"❌ {name}{label} : Seq Scan sur {', '.join(seq_scans)}")
+                    if args.verbose:
+                        print(plan)
+                else:
+                    print(f"✅ {name}{label}")
+
+    engine.dispose()
+    if failures:
+        print(f"{failures} requête(s) en Seq Scan sur une grande table.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import pandas as pd
+import streamlit as st
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
+from data_loader import load_main_dataframe
+from queries import COMPARISON_KPIS, build_comparison_query
+from utils import formater_duree
+
+COMPARISON_MODES = ["Aucune", "Période précédente", "Même période le mois précédent"]
+
+def comparison_window(start_date, end_date, mode):
+    if mode == "Même période le mois précédent":
+        return start_date - relativedelta(months=1), end_date - relativedelta(months=1)
+    nb_days = (end_date - start_date).days + 1
+    return start_date - timedelta(days=nb_days), start_date - timedelta(days=1)
+
+CUBE_KEYS = ["source", "statut", "catégorie", "jour_index"]
+# Une période sans aucun lead n'a pas de ligne de totaux : comptes et revenu valent 0, les moyennes restent indéfinies
+AVERAGE_KPIS = {"avg_price", "avg_heat"}
+
+def load_comparison(base_sql, params, start_date, end_date, mode):
+    """
+    Charge les KPIs et le cube source × statut × fraîcheur × jour des deux périodes en une seule requête.
+
+    Args:
+        base_sql (str): Requête de base (`main_query_sql` ou `campaign_query_sql`) filtrée par
+            `s.lead_created_at BETWEEN :start_date AND :end_date` ; ces bornes sont remplacées par
+            celles de chaque période.
+        params (dict): Paramètres de la requête de base.
+        start_date, end_date (date): Période courante.
+        mode (str): Une des valeurs de COMPARISON_MODES (hors "Aucune").
+
+    Returns:
+        tuple: (dict {kpi: (courant, précédent)}, pd.DataFrame du cube, (début, fin) de la période précédente)
+    """
+    previous_start, previous_end = comparison_window(start_date, end_date, mode)
+    comparison_params = dict(
+        params,
+        current_start=params["start_date"],
+        current_end=params["end_date"],
+        previous_start=previous_start,
+        previous_end=previous_end,
+    )
+    result = load_main_dataframe(build_comparison_query(base_sql), comparison_params)
+
+    totals = result[result["is_total"]].set_index("period").reindex(["current", "previous"])
+    for name in COMPARISON_KPIS:
+        if name == "total_revenue":
+            totals[name] = totals[name].fillna(0)
+        elif name not in AVERAGE_KPIS:
+            totals[name] = totals[name].fillna(0).astype(int)
+    kpis = {name: (totals.at["current", name], totals.at["previous", name]) for name in COMPARISON_KPIS}
+
+    detail = result[~result["is_total"]]
+    cube = pd.DataFrame({
+        f"volume_{period}": detail[detail["period"] == period].groupby(CUBE_KEYS)["volume"].sum()
+        for period in ("current", "previous")
+    }).fillna(0).astype(int).reset_index()
+    return kpis, cube, (previous_start, previous_end)
+
+def _delta_percent(current, previous):
+    if pd.isnull(current) or pd.isnull(previous) or not previous:
+        return None
+    return f"{(current - previous) / previous * 100:+.1f}%"
+
+def show_comparison_kpis(kpis, previous_window):
+    st.caption(f"Comparaison avec la période du {previous_window[0]:%d/%m/%Y} au {previous_window[1]:%d/%m/%Y}")
+    col1, col2, col3, col4, col5 = st.columns(5)
+    leads, revenue, price = kpis["total_leads"], kpis["total_revenue"], kpis["avg_price"]
+    sources, heat = kpis["unique_sources"], kpis["avg_heat"]
+    col1.metric("🧾 Total leads", f"{leads[0]:,}", _delta_percent(*leads))
+    col2.metric("💰 Revenu total (€)", f"{revenue[0]:,.2f}", _delta_percent(*revenue))
+    col3.metric("💸 Prix moyen / lead", f"{price[0]:,.2f}" if pd.notnull(price[0]) else "–", _delta_percent(*price))
+    col4.metric("📡 Sources uniques", sources[0], int(sources[0] - sources[1]))
+    heat_delta = None
+    if pd.notnull(heat[0]) and pd.notnull(heat[1]):
+        diff = pd.Timedelta(heat[0]) - pd.Timedelta(heat[1])
+        heat_delta = ("-" if diff < pd.Timedelta(0) else "+") + formater_duree(abs(diff))
+    col5.metric("🔥 Chaleur moyenne", formater_duree(heat[0]), heat_delta, delta_color="inverse")
+
+    others = pd.DataFrame(
+        [(label, kpis[name][0], kpis[name][1]) for name, label in (
+            ("nb_registrations", "Inscriptions"),
+            ("nb_leads", "Leads créés"),
+            ("sold", "Leads vendus"),
+            ("exclusive", "Leads exclusifs"),
+        )],
+        columns=["Indicateur", "Période courante", "Période précédente"]
+    )
+    others["Écart"] = others["Période courante"] - others["Période précédente"]
+    st.dataframe(others, hide_index=True, use_container_width=True)
+
+def pivot_delta(cube, index, columns):
+    """Pivot des volumes de la période courante, chaque cellule annotée de l'écart avec la période précédente."""
+    grouped = cube.groupby([index, columns])[["volume_current", "volume_previous"]].sum()
+    current = grouped["volume_current"].unstack(fill_value=0)
+    previous = grouped["volume_previous"].unstack(fill_value=0)
+    current, previous = current.align(previous, fill_value=0)
+    delta = (current - previous).astype(int)
+    return current.astype(int).astype(str) + " (" + delta.map(lambda d: f"{d:+d}") + ")"
+
+def show_comparison_pivots(cube, sections=("source_jour", "fraicheur", "statuts")):
+    if cube.empty:
+        st.info("Aucune donnée disponible pour les filtres sélectionnés.")
+        return
+    cube = cube.assign(jour=cube["jour_index"].map(lambda n: f"J{int(n) + 1}"))
+
+    if "source_jour" in sections:
+        st.subheader("🔁 Volume par jour et source – écart vs période précédente")
+        pivot = pivot_delta(cube, "source", "jour")
+        st.dataframe(pivot[sorted(pivot.columns, key=lambda j: int(j[1:]))], use_container_width=True)
+    if "fraicheur" in sections:
+        st.subheader("🔁 Fraîcheur des leads – écart vs période précédente")
+        pivot = pivot_delta(cube, "catégorie", "jour")
+        st.dataframe(pivot[sorted(pivot.columns, key=lambda j: int(j[1:]))], use_container_width=True)
+    if "statuts" in sections:
+        st.subheader("🔁 Statuts par source – écart vs période précédente")
+        st.dataframe(pivot_delta(cube, "source", "statut"), use_container_width=True)
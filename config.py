@@ -1,20 +1,29 @@
 import streamlit as st
-from sqlalchemy import create_engine
 from urllib.parse import quote_plus
 
-def get_engine():
+def get_database_url():
     DB_TYPE = st.secrets["DB_TYPE"]
     DB_USER = st.secrets["DB_USER"]
     DB_PASS = quote_plus(st.secrets["DB_PASS"])
     DB_HOST = st.secrets["DB_HOST"]
     DB_PORT = st.secrets["DB_PORT"]
     DB_NAME = st.secrets["DB_NAME"]
+    return f"{DB_TYPE}://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+def get_engine(database_url: str = None):
+    # Import différé : SQLAlchemy n'est chargé qu'à la première connexion
+    from sqlalchemy import create_engine
+
+    database_url = database_url or get_database_url()
     try:
         return create_engine(
-            f"{DB_TYPE}://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}",
+            database_url,
             connect_args={"connect_timeout": 5}
         )
     except Exception as e:
         raise RuntimeError(f"Database connection failed: {e}") from e
 
+@st.cache_resource(show_spinner=False)
+def get_shared_engine():
+    """Moteur unique par processus, créé à la première requête (jamais à l'import d'une page)."""
+    return get_engine()
@@ -0,0 +1,106 @@
+import math
+import pandas as pd
+import streamlit as st
+from data_loader import load_main_dataframe, load_row_count
+from queries import GRID_FILTER_COLUMNS, build_page_query, build_count_query
+from utils import to_sql_param
+
+PAGE_SIZES = [50, 100, 250, 500]
+
+SORT_OPTIONS = {
+    "Date du lead": "lead_created_at",
+    "ID stat": "stat_id",
+    "Prix (€)": "price_eur",
+}
+
+# Mêmes colonnes, dans le même ordre, que queries.GRID_FILTER_COLUMNS
+FILTER_COLUMNS = {
+    "client_name": "Client",
+    "campaign_name": "Campagne",
+    "vertical_name": "Verticale",
+    "affiliate_name": "Source",
+    "aff_id": "Ad ID",
+    "zipcode": "Code postal",
+    "last_client_status": "Statut client",
+}
+
+def _cursor_from_row(row, sort_key):
+    sort_value = row[sort_key]
+    if sort_key == "price_eur" and pd.isnull(sort_value):
+        sort_value = 0
+    lead_id = 0 if pd.isnull(row["lead_id"]) else row["lead_id"]
+    return to_sql_param(sort_value), to_sql_param(row["stat_id"]), to_sql_param(lead_id)
+
+def _go_next(state_key):
+    state = st.session_state[state_key]
+    if state["page"] + 1 >= len(state["cursors"]):
+        state["cursors"].append(state["next_cursor"])
+    state["page"] += 1
+
+def _go_previous(state_key):
+    state = st.session_state[state_key]
+    state["page"] = max(state["page"] - 1, 0)
+
+def show_paginated_table(base_sql, params, key, hidden_columns=(), postprocess=None, count_base_sql=None):
+    """
+    Affiche un tableau paginé côté serveur (keyset sur stat_id, lead_id) : seule la page courante
+    est chargée et envoyée au navigateur.
+
+    Args:
+        base_sql (str): Requête SQL de base (alias de colonnes de `queries.main_query_sql`).
+        params (dict): Paramètres de la requête de base.
+        key (str): Préfixe unique des widgets et de l'état de session.
+        hidden_columns (iterable): Colonnes masquées à l'affichage.
+        postprocess (callable): Transformation appliquée à la page chargée.
+        count_base_sql (str): Variante de `base_sql` sans le statut client, plus rapide à compter ;
+            utilisée tant qu'aucun filtre ne porte sur `last_client_status`.
+    """
+    col_sort, col_order, col_size = st.columns([2, 1, 1])
+    sort_label = col_sort.selectbox("Trier par", list(SORT_OPTIONS), key=f"{key}_sort")
+    descending = col_order.toggle("Décroissant", value=True, key=f"{key}_desc")
+    page_size = col_size.selectbox("Lignes / page", PAGE_SIZES, index=1, key=f"{key}_size")
+    sort_key = SORT_OPTIONS[sort_label]
+
+    filters = {}
+    with st.expander("🔎 Filtres colonnes"):
+        filter_cols = st.columns(4)
+        for i, (col, label) in enumerate(FILTER_COLUMNS.items()):
+            value = filter_cols[i % 4].text_input(label, key=f"{key}_f_{col}").strip()
+            if value:
+                filters[col] = value
+
+    grid_params = dict(params)
+    grid_params.update({f"_f_{col}": f"%{filters[col]}%" if col in filters else None for col in GRID_FILTER_COLUMNS})
+
+    # Toute modification des filtres ou du tri renvoie à la première page
+    signature = (base_sql, repr(sorted(params.items())), sort_key, descending, page_size, tuple(sorted(filters.items())))
+    state_key = f"{key}_grid"
+    state = st.session_state.get(state_key)
+    if state is None or state["signature"] != signature:
+        state = {"signature": signature, "cursors": [None], "page": 0, "next_cursor": None}
+        st.session_state[state_key] = state
+
+    count_sql = base_sql if count_base_sql is None or "last_client_status" in filters else count_base_sql
+    total = load_row_count(build_count_query(count_sql, GRID_FILTER_COLUMNS), grid_params)
+
+    cursor = state["cursors"][state["page"]] or (None, None, None)
+    page_params = dict(grid_params, _limit=page_size)
+    page_params["_after_sort"], page_params["_after_id"], page_params["_after_lead_id"] = cursor
+    query = build_page_query(base_sql, sort_key, descending, GRID_FILTER_COLUMNS)
+    page_df = load_main_dataframe(query, page_params)
+
+    state["next_cursor"] = _cursor_from_row(page_df.iloc[-1], sort_key) if not page_df.empty else None
+    has_next = len(page_df) == page_size and (state["page"] + 1) * page_size < total
+
+    if postprocess is not None:
+        page_df = postprocess(page_df)
+
+    st.dataframe(page_df.drop(columns=list(hidden_columns), errors="ignore"), use_container_width=True)
+
+    nb_pages = max(math.ceil(total / page_size), 1)
+    col_prev, col_info, col_next = st.columns([1, 3, 1])
+    col_prev.button("◀ Précédent", key=f"{key}_prev", disabled=state["page"] == 0,
+                    on_click=_go_previous, args=(state_key,))
+    col_info.caption(f"Page {state['page'] + 1} / {nb_pages} — {total:,} lignes")
+    col_next.button("Suivant ▶", key=f"{key}_next", disabled=not has_next,
+                    on_click=_go_next, args=(state_key,))
@@ -1,13 +1,22 @@
 import pandas as pd
+from collections import OrderedDict
+from datetime import timedelta
 import streamlit as st
-from config import get_engine
-from utils import nettoyer_nom_campagne
-
-engine = get_engine()
+from config import get_shared_engine
+from utils import nettoyer_nom_campagne, to_sql_param, STATUTS_FINAUX
+from queries import (
+    build_campaign_daily_revenue_query,
+    build_status_watermark_query,
+    build_first_status_query,
+    build_training_query,
+    prepared_statement,
+    execute_sql
+)
+from scoring import refresh_model
 
 @st.cache_data(ttl=3600)
 def load_filter_data():
-    with engine.connect() as conn:
+    with get_shared_engine().connect() as conn:
         clients_df = pd.read_sql("SELECT id, name FROM client", conn)
         clients_mapping = dict(zip(clients_df["name"], clients_df["id"]))
 
@@ -31,6 +40,75 @@ def load_filter_data():
             "ads": pd.read_sql("SELECT DISTINCT aff_id FROM stat", conn)["aff_id"].dropna().tolist()
         }
 
+# === Requêtes préparées ===
+# Les requêtes des pages ont une forme fixe (filtres en tableaux ou NULL = tous) : chacune est préparée
+# une seule fois par connexion du pool, les exécutions suivantes ne sont plus analysées ni replanifiées.
+# Au-delà de PREPARED_PER_CONNECTION, la requête la moins récemment utilisée est libérée (DEALLOCATE).
+PREPARED_PER_CONNECTION = 64
+
+def _prepared(conn, sql, params):
+    """
+    Renvoie la requête `EXECUTE` équivalente à `sql` et ses paramètres, en préparant `sql` à sa
+    première exécution sur cette connexion.
+    """
+    from sqlalchemy.sql import text
+
+    statement, positional_sql, names = prepared_statement(sql)
+    # `info` suit la connexion DBAPI : une connexion recréée par le pool repart sans requête préparée
+    prepared = conn.connection.info.setdefault("prepared_statements", OrderedDict())
+    if statement in prepared:
+        prepared.move_to_end(statement)
+    else:
+        if len(prepared) >= PREPARED_PER_CONNECTION:
+            oldest, _ = prepared.popitem(last=False)
+            conn.exec_driver_sql(f"DEALLOCATE {oldest}")
+        conn.exec_driver_sql(f"PREPARE {statement} AS {positional_sql}")
+        prepared[statement] = True
+
+    return text(execute_sql(statement, names)), {name: params[name] for name in names}
+
 def load_main_dataframe(query, params):
-    with engine.connect() as conn:
-        return pd.read_sql(query, conn, params=params)
+    with get_shared_engine().connect() as conn:
+        statement, statement_params = _prepared(conn, query.text, params or {})
+        return pd.read_sql(statement, conn, params=statement_params)
+
+@st.cache_data(ttl=600)
+def load_row_count(count_sql, params):
+    with get_shared_engine().connect() as conn:
+        statement, statement_params = _prepared(conn, count_sql, params)
+        return int(conn.execute(statement, statement_params).scalar())
+
+@st.cache_data(ttl=600, show_spinner=False)
+def load_plan_estimate(sql, params):
+    """Lignes et largeur moyenne (octets) estimées par le planificateur, sans exécuter la requête."""
+    from sqlalchemy.sql import text
+
+    with get_shared_engine().connect() as conn:
+        plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()[0]["Plan"]
+    return int(plan["Plan Rows"]), int(plan["Plan Width"])
+
+@st.cache_data(ttl=3600)
+def load_campaign_daily_revenue(start_date, end_date):
+    # Borne de fin exclusive : le dernier jour est inclus en entier
+    params = {"start_date": start_date, "end_date": end_date + timedelta(days=1)}
+    with get_shared_engine().connect() as conn:
+        return pd.read_sql(build_campaign_daily_revenue_query(), conn, params=params)
+
+@st.cache_data(ttl=600)
+def load_status_watermark():
+    with get_shared_engine().connect() as conn:
+        watermark = pd.read_sql(build_status_watermark_query(), conn)["watermark"].iloc[0]
+    return None if pd.isnull(watermark) else to_sql_param(watermark)
+
+def load_first_status():
+    with get_shared_engine().connect() as conn:
+        return to_sql_param(pd.read_sql(build_first_status_query(), conn)["first_status"].iloc[0])
+
+def load_training_frame(since, until):
+    params = {"since": since, "until": until, "final_statuses": list(STATUTS_FINAUX)}
+    with get_shared_engine().connect() as conn:
+        return pd.read_sql(build_training_query(), conn, params=params)
+
+@st.cache_resource(show_spinner="🤖 Mise à jour du modèle...", max_entries=2)
+def load_lead_outcome_model(watermark):
+    return refresh_model(watermark, load_training_frame, lambda statuts: statuts == "Sale", load_first_status)
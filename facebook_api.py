@@ -1,3 +1,4 @@
+import json
 import requests
 import pandas as pd
 
@@ -26,3 +27,44 @@ def get_facebook_campaign_insights(ad_account_id: str, access_token: str, date_p
     data = response.json().get("data", [])
     
     return pd.DataFrame(data)
+
+
+def get_facebook_daily_insights(ad_account_id: str, access_token: str, since, until) -> pd.DataFrame:
+    """
+    Récupère les dépenses quotidiennes par campagne sur une plage de dates arbitraire.
+
+    Args:
+        ad_account_id (str): ID du compte publicitaire (ex: "act_1234567890")
+        access_token (str): Jeton d'accès API Facebook.
+        since (date): Premier jour inclus.
+        until (date): Dernier jour inclus.
+
+    Returns:
+        pd.DataFrame: Une ligne par campagne et par jour (date, campaign_id, campaign_name, spend, impressions, clicks)
+    """
+    url = f"https://graph.facebook.com/v18.0/{ad_account_id}/insights"
+    params = {
+        "access_token": access_token,
+        "level": "campaign",
+        "fields": "campaign_id,campaign_name,spend,impressions,clicks",
+        "time_range": json.dumps({"since": since.isoformat(), "until": until.isoformat()}),
+        "time_increment": 1,
+        "limit": 1000
+    }
+
+    rows = []
+    while url:
+        response = requests.get(url, params=params)
+        response.raise_for_status()
+        payload = response.json()
+        rows.extend(payload.get("data", []))
+        # L'URL "next" contient déjà tous les paramètres
+        url = payload.get("paging", {}).get("next")
+        params = None
+
+    df = pd.DataFrame(rows, columns=["date_start", "campaign_id", "campaign_name", "spend", "impressions", "clicks"])
+    df = df.rename(columns={"date_start": "date"})
+    df["date"] = pd.to_datetime(df["date"])
+    for col in ["spend", "impressions", "clicks"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    return df
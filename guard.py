@@ -0,0 +1,36 @@
+"""
+Garde-fou sur la taille des résultats : le volume d'une requête est estimé avant son chargement
+et comparé au budget mémoire d'une session. Au-delà, la page bascule en mode agrégé (indicateurs
+et tableaux calculés par la base, données consultables page par page) au lieu de charger le frame.
+"""
+from data_loader import load_plan_estimate, load_row_count
+from queries import build_count_query
+
+# Mémoire maximale qu'un frame chargé par une session peut occuper
+SESSION_MEMORY_BUDGET_MB = 512
+# Un frame pandas occupe plusieurs fois la largeur de ligne estimée par Postgres (textes en objets Python)
+PANDAS_OVERHEAD = 5
+# Dans cette plage (fraction du budget), l'estimation du planificateur est confirmée par un COUNT(*)
+UNCERTAIN_RANGE = (0.25, 4)
+
+def estimate_result_size(base_sql, params, count_base_sql=None):
+    """
+    Estime l'empreinte mémoire du frame que produirait `base_sql`.
+
+    Args:
+        base_sql (str): Requête à évaluer (ex: `main_query_sql(where_clause)`).
+        params (dict): Paramètres de la requête.
+        count_base_sql (str): Variante de `base_sql` à même nombre de lignes, moins coûteuse à compter.
+
+    Returns:
+        dict: {"rows": lignes estimées, "size_mb": taille estimée en Mo, "over_budget": bool}
+    """
+    rows, width = load_plan_estimate(base_sql, params)
+    row_bytes = width * PANDAS_OVERHEAD
+    budget = SESSION_MEMORY_BUDGET_MB * 1024 ** 2
+    low, high = UNCERTAIN_RANGE
+    if low * budget <= rows * row_bytes <= high * budget:
+        # Trop proche du budget pour se fier au planificateur : comptage exact (partagé avec la grille paginée)
+        rows = load_row_count(build_count_query(count_base_sql or base_sql), params)
+    size = rows * row_bytes
+    return {"rows": rows, "size_mb": size / 1024 ** 2, "over_budget": size > budget}
@@ -1,4 +1,5 @@
 import pandas as pd
+from collections import Counter
 from utils import formater_duree
 
 def compute_kpis(df):
@@ -12,3 +13,58 @@ def compute_kpis(df):
         "unique_sources": df["affiliate_name"].nunique(),
         "avg_heat": mean_heat_timedelta
     }
+
+def summarize_frame(df):
+    """Indicateurs de la vue d'ensemble, mêmes clés que `build_summary_query` (mode agrégé)."""
+    summary = compute_kpis(df)
+    summary.update({
+        "nb_registrations": df["registration_id"].nunique(),
+        "nb_leads": df["lead_id"].notna().sum(),
+        "sold": (df["number_of_sales"].fillna(0).astype(int) > 0).sum(),
+        "exclusive": df["sold_to_exclusive"].sum(),
+        "not_exclusive": (~df["sold_to_exclusive"]).sum(),
+        "daily_cap_total": df["daily_cap"].dropna().astype(int).sum(),
+        "has_daily": df["daily_cap"].notna().any(),
+        "monthly_cap_total": df["monthly_cap"].dropna().astype(int).sum(),
+        "has_monthly": df["monthly_cap"].notna().any(),
+    })
+    return summary
+
+# === KPIs incrémentaux (mode live) ===
+# Sommes et compteurs additifs : un delta de lignes se fusionne sans relire tout le frame.
+def kpi_totals(df):
+    heat = pd.to_datetime(df["lead_created_at"]) - pd.to_datetime(df["registration_created_at"])
+    return {
+        "rows": len(df),
+        "revenue": df["price_eur"].sum(),
+        "price_count": int(df["price_eur"].count()),
+        "heat_sum": heat.sum(),
+        "heat_count": int(heat.count()),
+        "sources": Counter(df["affiliate_name"].dropna()),
+    }
+
+def merge_kpi_totals(totals, added, removed=None):
+    sources = Counter(totals["sources"])
+    sources.update(added["sources"])
+    merged = {
+        "rows": totals["rows"] + added["rows"],
+        "revenue": totals["revenue"] + added["revenue"],
+        "price_count": totals["price_count"] + added["price_count"],
+        "heat_sum": totals["heat_sum"] + added["heat_sum"],
+        "heat_count": totals["heat_count"] + added["heat_count"],
+    }
+    if removed is not None:
+        sources.subtract(removed["sources"])
+        for key in merged:
+            merged[key] -= removed[key]
+    merged["sources"] = +sources
+    return merged
+
+def kpis_from_totals(totals):
+    return {
+        "total_leads": totals["rows"],
+        "total_revenue": totals["revenue"],
+        "avg_price": totals["revenue"] / totals["price_count"] if totals["price_count"] else float("nan"),
+        "unique_sources": len(totals["sources"]),
+        "avg_heat": totals["heat_sum"] / totals["heat_count"] if totals["heat_count"] else pd.NaT
+    }
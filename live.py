@@ -0,0 +1,109 @@
+import pandas as pd
+import streamlit as st
+from datetime import datetime, timedelta
+from data_loader import load_main_dataframe
+from queries import build_main_query, build_live_delta_query, build_status_changes_query, build_status_watermark_query
+from kpis import kpi_totals, merge_kpi_totals, kpis_from_totals
+from utils import formater_duree, to_sql_param
+
+LIVE_REFRESH_SECONDS = 30
+LIVE_STATE_KEY = "live_frame"
+# Chaque poll relit une marge derrière les watermarks : une ligne validée après le poll précédent avec
+# un id ou une date déjà dépassés est quand même lue. Remplacer par stat_id et réappliquer un statut
+# sont idempotents, la marge ne compte donc rien deux fois.
+LIVE_TIME_OVERLAP = timedelta(minutes=2)
+LIVE_STAT_ID_OVERLAP = 1000
+
+def _row_watermarks(df):
+    if df.empty:
+        return None, None
+    return to_sql_param(df["stat_id"].max()), to_sql_param(pd.to_datetime(df["lead_created_at"]).max())
+
+def start_live_frame(where_clause, params):
+    # Watermark initial des statuts lu dans la colonne elle-même (et non l'horloge du serveur) : il reste
+    # dans le même fuseau que `created_at`, et il est lu avant le frame pour que rien ne soit perdu entre les deux
+    status_since = load_main_dataframe(build_status_watermark_query(), {})["watermark"].iloc[0]
+    df = load_main_dataframe(build_main_query(where_clause), params)
+    last_stat_id, last_lead_created_at = _row_watermarks(df)
+    return {
+        "where_clause": where_clause,
+        "params": params,
+        "df": df,
+        "totals": kpi_totals(df),
+        "last_stat_id": last_stat_id if last_stat_id is not None else 0,
+        "last_lead_created_at": last_lead_created_at if last_lead_created_at is not None else params["start_date"],
+        "status_since": params["start_date"] if pd.isnull(status_since) else to_sql_param(status_since),
+        "last_poll": datetime.now(),
+        "last_delta_rows": 0,
+        "last_status_changes": 0,
+    }
+
+def refresh_live_frame(state):
+    """Applique au frame en session les nouvelles lignes et les changements de statut depuis le dernier watermark."""
+    delta_params = dict(
+        state["params"],
+        last_stat_id=state["last_stat_id"] - LIVE_STAT_ID_OVERLAP,
+        last_lead_created_at=state["last_lead_created_at"] - LIVE_TIME_OVERLAP,
+    )
+    delta = load_main_dataframe(build_live_delta_query(state["where_clause"]), delta_params)
+    df = state["df"]
+    new_rows = int((~delta["stat_id"].isin(df["stat_id"])).sum())
+
+    if not delta.empty:
+        replaced = df["stat_id"].isin(delta["stat_id"])
+        removed_totals = kpi_totals(df[replaced]) if replaced.any() else None
+        state["totals"] = merge_kpi_totals(state["totals"], kpi_totals(delta), removed_totals)
+        last_stat_id, last_lead_created_at = _row_watermarks(delta)
+        state["last_stat_id"] = max(state["last_stat_id"], last_stat_id)
+        if not df.empty:
+            last_lead_created_at = max(state["last_lead_created_at"], last_lead_created_at)
+        state["last_lead_created_at"] = last_lead_created_at
+        df = pd.concat([df[~replaced], delta], ignore_index=True)
+
+    changes = load_main_dataframe(build_status_changes_query(), {"since": state["status_since"] - LIVE_TIME_OVERLAP})
+    status_changes = 0
+    if not changes.empty:
+        statuses = changes.set_index("lead_id")["status"]
+        touched = df["lead_id"].isin(statuses.index)
+        updated = df.loc[touched, "lead_id"].map(statuses)
+        status_changes = int((updated != df.loc[touched, "last_client_status"]).sum())
+        df.loc[touched, "last_client_status"] = updated
+        # Le statut le plus récent reste dans la marge relue : le watermark ne recule pas
+        state["status_since"] = to_sql_param(pd.to_datetime(changes["created_at"]).max())
+
+    state["df"] = df
+    state["last_poll"] = datetime.now()
+    state["last_delta_rows"] = new_rows
+    state["last_status_changes"] = status_changes
+    return state
+
+def get_live_frame(where_clause, params):
+    """
+    Renvoie l'état live en session, chargé intégralement une seule fois par jeu de filtres.
+    Les rafraîchissements suivants passent par `show_live_panel`, qui ne lit que les deltas.
+    """
+    state = st.session_state.get(LIVE_STATE_KEY)
+    if state is None or state["where_clause"] != where_clause or state["params"] != params:
+        state = start_live_frame(where_clause, params)
+        st.session_state[LIVE_STATE_KEY] = state
+    return state
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def show_live_panel():
+    state = st.session_state.get(LIVE_STATE_KEY)
+    if state is None:
+        return
+    state = refresh_live_frame(state)
+    kpis = kpis_from_totals(state["totals"])
+
+    st.subheader("🔴 Live – aujourd'hui")
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("🧾 Total leads", f"{kpis['total_leads']:,}", delta=state["last_delta_rows"] or None)
+    col2.metric("💰 Revenu total (€)", f"{kpis['total_revenue']:,.2f}")
+    col3.metric("💸 Prix moyen / lead", f"{kpis['avg_price']:,.2f}")
+    col4.metric("📡 Sources uniques", kpis["unique_sources"])
+    col5.metric("🔥 Chaleur moyenne", formater_duree(kpis["avg_heat"]))
+    st.caption(
+        f"Mis à jour à {state['last_poll']:%H:%M:%S} — {state['last_delta_rows']} nouvelles lignes, "
+        f"{state['last_status_changes']} changements de statut (rafraîchi toutes les {LIVE_REFRESH_SECONDS}s)"
+    )
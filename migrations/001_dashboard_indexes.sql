@@ -0,0 +1,27 @@
+-- Index dont dépendent les requêtes du dashboard (queries.py).
+-- CREATE INDEX CONCURRENTLY ne bloque pas les écritures mais doit tourner hors transaction :
+--     psql "$DATABASE_URL" -f migrations/001_dashboard_indexes.sql
+-- Vérification des plans : python check_query_plans.py
+
+-- stat : filtre de période (toutes les pages), filtres client / ad ID du V0, live mode
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_stat_lead_created_at ON stat (lead_created_at);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_stat_client_lead_created_at ON stat (client, lead_created_at);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_stat_aff_id_lead_created_at ON stat (aff_id, lead_created_at);
+-- stat : jointure depuis registration quand le plan part d'une campagne (page Campagne)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_stat_registration ON stat (registration);
+
+-- lead : jointures registration -> lead et campagne -> lead
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_lead_registration_id ON lead (registration_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_lead_campaign_id ON lead (campaign_id);
+
+-- campaign : liste des campagnes par statut (page Campagne)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_campaign_status ON campaign (status);
+
+-- lead_client_lead_status : dernier statut par lead (LATERAL ... LIMIT 1) et deltas du mode live
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_lcls_lead_id_created_at ON lead_client_lead_status (lead_id, created_at DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_lcls_created_at ON lead_client_lead_status (created_at);
+
+ANALYZE stat;
+ANALYZE lead;
+ANALYZE campaign;
+ANALYZE lead_client_lead_status;
@@ -1,22 +1,27 @@
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
 from utils import download_excel_button
 
 
-from datetime import datetime
+from datetime import datetime, time
 from page_config import set_dashboard_page_config
 from filters import build_filters
 from data_loader import load_filter_data, load_main_dataframe
-from queries import build_main_query
-from kpis import compute_kpis
+from queries import main_query_sql, build_main_query, build_v0_filters, build_summary_query, build_summary_cube_query
+from data_grid import show_paginated_table
+from guard import SESSION_MEMORY_BUDGET_MB, estimate_result_size
+from kpis import summarize_frame, kpis_from_totals
+from live import get_live_frame, show_live_panel
+from charts import pie_chart, gauge_chart
+from comparison import COMPARISON_MODES, load_comparison, show_comparison_kpis, show_comparison_pivots
 from visuals import (
     show_leads_volume_chart,
     show_source_by_day_pivot,
     show_lead_freshness_pivot,
-    show_status_by_source_pivot
+    show_status_by_source_pivot,
+    show_predicted_sale_rates
 )
-from utils import nettoyer_nom_campagne, formater_duree
+from pivots import status_counts
+from utils import nettoyer_nom_campagne, formater_duree, mapper_statuts_clients
 
 # === Config de la page ===
 set_dashboard_page_config()
@@ -32,38 +37,65 @@ ads = filter_data["ads"]
 # === Filtres dans la sidebar ===
 selections = build_filters(clients_mapping, campaigns_df, verticals, countries, ads)
 today = datetime.today()
-start_date = st.sidebar.date_input("Date de début", today.replace(day=1))
-end_date = st.sidebar.date_input("Date de fin", today)
+live_mode = st.sidebar.toggle("🔴 Mode live (aujourd'hui)", help="Suit les leads du jour en ne relisant que les nouveautés.")
+if live_mode:
+    start_date = end_date = today.date()
+else:
+    start_date = st.sidebar.date_input("Date de début", today.replace(day=1))
+    end_date = st.sidebar.date_input("Date de fin", today)
+comparison_mode = "Aucune" if live_mode else st.sidebar.selectbox("🔁 Comparer avec", COMPARISON_MODES)
 
 # === Construction de la requête SQL dynamique ===
-clauses = ["1=1"]
-params = {}
-
-if selections["clients"]:
-    clauses.append("s.client IN :clients")
-    params["clients"] = tuple(selections["clients"])
-
-if selections["campaigns"]:
-    clauses.append("c.id IN :campaigns")
-    params["campaigns"] = tuple(selections["campaigns"])
-
-if selections["verticals"]:
-    clauses.append("v.name IN :verticals")
-    params["verticals"] = tuple(selections["verticals"])
-
-if selections["ads"]:
-    clauses.append("s.aff_id IN :ads")
-    params["ads"] = tuple(selections["ads"])
-
-clauses.append("s.lead_created_at BETWEEN :start_date AND :end_date")
-params["start_date"] = start_date
-params["end_date"] = end_date
+where_clause, params = build_v0_filters(selections, start_date, end_date)
+if live_mode:
+    params["start_date"] = datetime.combine(today.date(), time.min)
+    params["end_date"] = datetime.combine(today.date(), time.max)
+
+base_sql = main_query_sql(where_clause)
+count_base_sql = main_query_sql(where_clause, with_last_status=False)
+
+def nettoyer_campagnes(frame):
+    frame["campaign_name"] = frame.apply(lambda row: nettoyer_nom_campagne(row["campaign_name"], row["vertical_name"]), axis=1)
+    return frame
+
+# === Garde-fou : estimation du volume avant chargement ===
+# Au-delà du budget mémoire, rien n'est chargé ligne à ligne : indicateurs et tableaux sont agrégés
+# par la base et les données restent consultables page par page.
+aggregate_mode = False
+if not live_mode:
+    result_size = estimate_result_size(base_sql, params, count_base_sql)
+    aggregate_mode = result_size["over_budget"]
 
 # === Exécution de la requête ===
-query = build_main_query(" AND ".join(clauses))
-df = load_main_dataframe(query, params)
-df["campaign_name"] = df.apply(lambda row: nettoyer_nom_campagne(row["campaign_name"], row["vertical_name"]), axis=1)
-df_display = df.drop(columns=["stat_id", "currency", "firstname", "lastname", "city", "registration_created_at"], errors="ignore")
+if live_mode:
+    live_state = get_live_frame(where_clause, params)
+    show_live_panel()
+    df = nettoyer_campagnes(live_state["df"].copy())
+    summary = summarize_frame(df)
+    summary.update(kpis_from_totals(live_state["totals"]))
+elif aggregate_mode:
+    st.warning(
+        f"⚠️ Environ {result_size['rows']:,} lignes (~{result_size['size_mb']:,.0f} Mo) dépasseraient le budget "
+        f"mémoire de {SESSION_MEMORY_BUDGET_MB} Mo : affichage en mode agrégé. Réduisez la période ou les filtres "
+        "pour retrouver le détail complet."
+    )
+    summary = load_main_dataframe(build_summary_query(base_sql), params).iloc[0]
+    cube = load_main_dataframe(build_summary_cube_query(base_sql), params)
+else:
+    query = build_main_query(where_clause)
+    df = nettoyer_campagnes(load_main_dataframe(query, params))
+    summary = summarize_frame(df)
+
+# === Comparaison de périodes : les deux fenêtres en un seul parcours ===
+if comparison_mode != "Aucune":
+    comparison_kpis, comparison_cube, previous_window = load_comparison(
+        base_sql, params, start_date, end_date, comparison_mode
+    )
+hidden_columns = ["stat_id", "currency", "firstname", "lastname", "city", "registration_created_at"]
+if aggregate_mode:
+    df_display = df = cube
+else:
+    df_display = df.drop(columns=hidden_columns, errors="ignore")
 
 # === TABS ===
 tab1, tab2, tab3, tab4, tab5 = st.tabs([
@@ -77,12 +109,22 @@ tab1, tab2, tab3, tab4, tab5 = st.tabs([
 # === ONGLET 1 : Données ===
 with tab1:
     st.subheader("📋 Résultats filtrés")
-    st.dataframe(df_display, use_container_width=True)
-    download_excel_button(
-        df=df_display,
-        filename="résultats_filtrés.xlsx",
-        label="📥 Télécharger Excel"
+    show_paginated_table(
+        base_sql,
+        params,
+        key="v0_data",
+        hidden_columns=hidden_columns,
+        postprocess=nettoyer_campagnes,
+        count_base_sql=count_base_sql
     )
+    if aggregate_mode:
+        st.caption("📥 Export Excel complet indisponible en mode agrégé : réduisez la période ou utilisez `batch_reports.py`.")
+    else:
+        download_excel_button(
+            df=df_display,
+            filename="résultats_filtrés.xlsx",
+            label="📥 Télécharger Excel"
+        )
 
 # === ONGLET 2 : KPIs ===
 with tab2:
@@ -98,35 +140,32 @@ with tab2:
         - **Chaleur moyenne** : Temps moyen entre l'inscription (`registration.created_at`) et le lead (`stat.lead_created_at`).
         """)
 
-    kpis = compute_kpis(df)
-    col1, col2, col3, col4, col5 = st.columns(5)
-    col1.metric("🧾 Total leads", f"{kpis['total_leads']:,}")
-    col2.metric("💰 Revenu total (€)", f"{kpis['total_revenue']:,.2f}")
-    col3.metric("💸 Prix moyen / lead", f"{kpis['avg_price']:,.2f}")
-    col4.metric("📡 Sources uniques", kpis["unique_sources"])
-    col5.metric("🔥 Chaleur moyenne", formater_duree(kpis["avg_heat"]))
-
-    import plotly.graph_objects as go
+    if comparison_mode != "Aucune":
+        show_comparison_kpis(comparison_kpis, previous_window)
+    else:
+        col1, col2, col3, col4, col5 = st.columns(5)
+        col1.metric("🧾 Total leads", f"{summary['total_leads']:,}")
+        col2.metric("💰 Revenu total (€)", f"{summary['total_revenue']:,.2f}")
+        col3.metric("💸 Prix moyen / lead", f"{summary['avg_price']:,.2f}")
+        col4.metric("📡 Sources uniques", summary["unique_sources"])
+        col5.metric("🔥 Chaleur moyenne", formater_duree(summary["avg_heat"]))
 
     # === Calcul dynamique du cap global sur la période filtrée ===
     delta_days = (end_date - start_date).days + 1
 
-    has_daily = df["daily_cap"].notna().any()
-    has_monthly = df["monthly_cap"].notna().any()
-
-    if has_daily:
-        daily_cap_total = df["daily_cap"].dropna().astype(int).sum()
+    if summary["has_daily"]:
+        daily_cap_total = int(summary["daily_cap_total"])
         adjusted_cap = daily_cap_total * delta_days
         cap_source = f"{daily_cap_total:,} leads / jour × {delta_days} jours"
-    elif has_monthly:
-        monthly_cap_total = df["monthly_cap"].dropna().astype(int).sum()
+    elif summary["has_monthly"]:
+        monthly_cap_total = int(summary["monthly_cap_total"])
         adjusted_cap = int(monthly_cap_total * (delta_days / 30))
         cap_source = f"{monthly_cap_total:,} leads / mois × {delta_days}/30 jours"
     else:
         adjusted_cap = 1
         cap_source = "Aucun cap défini dans la base"
 
-    leads_this_period = kpis['total_leads']
+    leads_this_period = summary['total_leads']
     progress = leads_this_period / adjusted_cap * 100
 
     # === Affichage expander + jauge ===
@@ -138,27 +177,13 @@ with tab2:
         - Progression actuelle : **{progress:.1f}%**
         """)
 
-    fig = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=progress,
-        domain={'x': [0, 1], 'y': [0, 1]},
-        title={'text': "Progression vers l'objectif (%)"},
-        gauge={
-            'axis': {'range': [0, 100]},
-            'bar': {'color': "darkblue"},
-            'steps': [
-                {'range': [0, 50], 'color': "#FFDDDD"},
-                {'range': [50, 80], 'color': "#FFF3B0"},
-                {'range': [80, 100], 'color': "#D2F6C5"},
-            ],
-        }
-    ))
+    fig = gauge_chart(progress, "Progression vers l'objectif (%)")
     st.plotly_chart(fig, use_container_width=True)
 
 
     with st.expander("📊 Stock de leads (registration vs lead)"):
-        nb_registrations = df["registration_id"].nunique()
-        nb_leads = df["lead_id"].notna().sum()
+        nb_registrations = summary["nb_registrations"]
+        nb_leads = summary["nb_leads"]
         stock = nb_registrations - nb_leads
 
         st.markdown(f"""
@@ -167,9 +192,9 @@ with tab2:
         - **Stock de leads restants** : {stock:,}
         """)
 
-    fig_stock = px.pie(
-        names=["Leads créés", "Stock restant"],
-        values=[nb_leads, max(stock, 0)],
+    fig_stock = pie_chart(
+        names=("Leads créés", "Stock restant"),
+        values=(nb_leads, max(stock, 0)),
         title="Répartition du stock de leads"
     )
     st.plotly_chart(fig_stock, use_container_width=True)
@@ -181,10 +206,10 @@ with tab2:
         Ces statuts viennent de `lead_client_lead_status.status`, et représentent la décision finale du client sur chaque lead (validé, refusé, etc.).
         """)
 
-    status_counts = df["last_client_status"].fillna("no_status").value_counts()
-    fig_status = px.pie(
-        names=status_counts.index,
-        values=status_counts.values,
+    counts = status_counts(df)
+    fig_status = pie_chart(
+        names=tuple(counts.index),
+        values=tuple(counts.values),
         title="Répartition des statuts des leads"
     )
     st.plotly_chart(fig_status, use_container_width=True)
@@ -194,13 +219,12 @@ with tab2:
         Cette visualisation montre la part de leads ayant généré au moins une vente (`stat.number_of_sales > 0`) versus ceux restés invendus.
         """)
 
-    df["is_sold"] = df["number_of_sales"].fillna(0).astype(int) > 0
-    vendu = df["is_sold"].sum()
-    invendu = (~df["is_sold"]).sum()
+    vendu = summary["sold"]
+    invendu = summary["total_leads"] - vendu
 
-    fig_sold = px.pie(
-        names=["Vendus", "Invendus"],
-        values=[vendu, invendu],
+    fig_sold = pie_chart(
+        names=("Vendus", "Invendus"),
+        values=(vendu, invendu),
         title="Leads vendus vs invendus"
     )
     st.plotly_chart(fig_sold, use_container_width=True)
@@ -211,12 +235,12 @@ with tab2:
         Ce graphique permet de suivre la qualité de diffusion et la promesse d’exclusivité si applicable.
         """)
 
-    exclusive = df["sold_to_exclusive"].sum()
-    not_exclusive = (~df["sold_to_exclusive"]).sum()
+    exclusive = summary["exclusive"]
+    not_exclusive = summary["not_exclusive"]
 
-    fig_exclu = px.pie(
-        names=["Exclusifs", "Mutualisés"],
-        values=[exclusive, not_exclusive],
+    fig_exclu = pie_chart(
+        names=("Exclusifs", "Mutualisés"),
+        values=(exclusive, not_exclusive),
         title="Exclusivité des leads"
     )
     st.plotly_chart(fig_exclu, use_container_width=True)
@@ -227,47 +251,31 @@ with tab3:
     show_leads_volume_chart(df_display)
 
 # === ONGLET 4 : Analyse approfondie ===
-def mapper_statuts_clients(statut):
-    mapping = {
-        "Sale": "Vente",
-        "Visit": "En cours",
-        "Uncalled": "En cours",
-        "Call Again": "En cours",
-        "Not Interested": "Refus",
-        "Duplicate": "Doublon",
-        "Wrong Phone": "Inéligible",
-        "Fake Phone": "Inéligible",
-        "Unreachable": "Inéligible",
-        "Not Cooperating": "Inéligible",
-        "Existing Client": "Hors cible",
-        "Out of Target": "Hors cible",
-        "Out of Geo": "Hors cible",
-        "Out of Age": "Hors cible",
-        "Out Of Eligible": "Hors cible"
-    }
-    return mapping.get(statut, "Autre")
-
-
 with tab4:
     show_source_by_day_pivot(df_display)
     show_lead_freshness_pivot(df)
     show_status_by_source_pivot(df_display)
 
+    if comparison_mode != "Aucune":
+        show_comparison_pivots(comparison_cube)
+
     st.subheader("📊 Statuts client (catégorisés)")
 
-    df_display["cat_statut"] = df_display["last_client_status"].fillna("no_status").apply(mapper_statuts_clients)
-    statuts_counts = df_display["cat_statut"].value_counts()
+    statuts_counts = status_counts(df_display).groupby(mapper_statuts_clients).sum().sort_values(ascending=False)
 
-    fig_cat_status = px.pie(
-        names=statuts_counts.index,
-        values=statuts_counts.values,
+    fig_cat_status = pie_chart(
+        names=tuple(statuts_counts.index),
+        values=tuple(statuts_counts.values),
         title="Répartition des statuts (catégorisés)"
     )
     st.plotly_chart(fig_cat_status, use_container_width=True)
 
 
-# === ONGLET 5 : Prévu pour ML & autres outils ===
+# === ONGLET 5 : Modèles & outils ===
 with tab5:
     st.subheader("🤖 Modèles de prédiction & outils exploratoires")
-    st.info("Cette section est réservée à l'ajout futur de modèles machine learning, de jauges de progression, ou d'outils de qualité.")
+    if aggregate_mode:
+        st.info("Le scoring lead par lead n'est pas disponible en mode agrégé : réduisez la période ou les filtres.")
+    else:
+        show_predicted_sale_rates(df)
 
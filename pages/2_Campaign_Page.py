@@ -1,51 +1,40 @@
 import streamlit as st
-import plotly.graph_objects as go
 from utils import download_excel_button
-import plotly.express as px
 import pandas as pd
 from datetime import datetime
-from sqlalchemy.sql import text
-from config import get_engine
+from data_loader import load_main_dataframe
 from page_config import set_dashboard_page_config
 from kpis import compute_kpis
+from queries import (
+    campaign_query_sql,
+    build_campaign_query,
+    build_top_campaigns_query,
+    build_campaign_names_query,
+    campaign_names_params
+)
+from data_grid import show_paginated_table
 from utils import formater_duree
+from charts import pie_chart, horizontal_bar_chart, daily_line_chart
+from comparison import COMPARISON_MODES, load_comparison, show_comparison_kpis, show_comparison_pivots
 from visuals import (
     show_leads_volume_chart,
-    show_status_by_source_pivot
+    show_status_by_source_pivot,
+    show_predicted_sale_rates
 )
 
 set_dashboard_page_config()
 
-# Connexion BDD
-engine = get_engine()
-
 # === Filtres dans la sidebar ===
 st.sidebar.title("🎯 Filtres Campagne")
 
 today = datetime.today()
 start_date = st.sidebar.date_input("Date de début", today.replace(day=1))
 end_date = st.sidebar.date_input("Date de fin", today)
+comparison_mode = st.sidebar.selectbox("🔁 Comparer avec", COMPARISON_MODES)
 
 # Afficher le Top 10 des campagnes par revenu total
-with engine.connect() as conn:
-    top_query = text("""
-        SELECT 
-            c.name AS campaign_name, 
-            COUNT(DISTINCT s.id) AS total_leads, 
-            SUM(s.price_eur) AS total_revenue, 
-            ROUND(AVG(s.price_eur)::numeric, 2) AS avg_price
-        FROM stat s
-        JOIN registration r ON r.id = s.registration
-        LEFT JOIN lead l ON l.registration_id = r.id
-        LEFT JOIN campaign c ON c.id = l.campaign_id
-        WHERE s.lead_created_at BETWEEN :start_date AND :end_date
-        GROUP BY c.name
-        ORDER BY total_revenue DESC
-        LIMIT 10
-
-    """)
-    top_df = pd.read_sql(top_query, conn, params={"start_date": start_date, "end_date": end_date})
-    default_campaign = top_df["campaign_name"].iloc[0] if not top_df.empty else None
+top_df = load_main_dataframe(build_top_campaigns_query(), {"start_date": start_date, "end_date": end_date})
+default_campaign = top_df["campaign_name"].iloc[0] if not top_df.empty else None
 
 
 status_options = ['enabled', 'paused', 'disabled', 'NULL']
@@ -58,23 +47,7 @@ selected_statuses = st.sidebar.multiselect(
 
 
 # Campagne à analyser
-with engine.connect() as conn:
-    if selected_statuses:
-        placeholders = ",".join(f"'{s}'" for s in selected_statuses if s != 'NULL')
-        null_clause = "OR status IS NULL" if 'NULL' in selected_statuses else ""
-        query_str = f"""
-            SELECT DISTINCT name FROM campaign
-            WHERE name IS NOT NULL
-            AND (status IN ({placeholders}) {null_clause})
-            ORDER BY name
-        """
-    else:
-        query_str = """
-            SELECT DISTINCT name FROM campaign
-            WHERE name IS NOT NULL
-            ORDER BY name
-        """
-    campagnes = pd.read_sql(query_str, conn)["name"].tolist()
+campagnes = load_main_dataframe(build_campaign_names_query(), campaign_names_params(selected_statuses))["name"].tolist()
 
 selected_campagne = st.sidebar.selectbox(
     "Campagne à analyser",
@@ -83,44 +56,17 @@ selected_campagne = st.sidebar.selectbox(
 )
 
 # Chargement données
-query = text("""
-    SELECT
-        s.id AS stat_id,
-        cl.name AS client_name,
-        s.price_eur,
-        s.number_of_sales,
-        r.sold_to_exclusive,
-        s.currency,
-        v.name AS vertical_name,
-        c.name AS campaign_name,
-        c.daily_cap,
-        c.monthly_cap,
-        r.id AS registration_id,
-        l.id AS lead_id,
-        r.created_at AS registration_created_at,
-        s.lead_created_at,
-        r.firstname,
-        r.lastname,
-        r.zipcode,
-        r.city,
-        s.aff_id,
-        r.others::json->>'source' AS affiliate_name,
-        r.others::json->>'aff_sub' AS aff_sub,
-        l.last_lead_client_status AS last_client_status
-    FROM stat s
-    JOIN registration r ON r.id = s.registration
-    LEFT JOIN lead l ON l.registration_id = r.id
-    LEFT JOIN campaign c ON c.id = l.campaign_id
-    LEFT JOIN vertical v ON c.vertical_id = v.id
-    LEFT JOIN client cl ON cl.id = s.client
-    WHERE c.name = :campagne AND s.lead_created_at BETWEEN :start_date AND :end_date
-""")
+campaign_where = "c.name = :campagne AND s.lead_created_at BETWEEN :start_date AND :end_date"
+query = build_campaign_query(campaign_where)
 
 params = {"campagne": selected_campagne, "start_date": start_date, "end_date": end_date}
-with engine.connect() as conn:
-    df = pd.read_sql(query, conn, params=params)
+df = load_main_dataframe(query, params)
 
 kpis = compute_kpis(df)
+if comparison_mode != "Aucune":
+    comparison_kpis, comparison_cube, previous_window = load_comparison(
+        campaign_query_sql(campaign_where), params, start_date, end_date, comparison_mode
+    )
 df["jour"] = pd.to_datetime(df["lead_created_at"]).dt.date
 cap_par_jour = df.groupby("jour")["daily_cap"].max().fillna(0).astype(int)
 real_daily_cap_total = cap_par_jour.sum()
@@ -134,25 +80,19 @@ values = {
     "Cap réel (daily_cap jour/jour)": real_daily_cap_total,
     "Cap indicatif (monthly_cap)": monthly_cap_adjusted,
 }
-fig_bar = go.Figure(go.Bar(
-    x=list(values.values()),
-    y=list(values.keys()),
-    orientation='h',
-    text=[f"{v:,}" for v in values.values()],
-    textposition="auto",
-    marker=dict(color=["#1f77b4", "#2ca02c", "#ff7f0e"])
-))
-fig_bar.update_layout(
+fig_bar = horizontal_bar_chart(
+    labels=tuple(values.keys()),
+    values=tuple(values.values()),
+    colors=("#1f77b4", "#2ca02c", "#ff7f0e"),
     title="Comparaison des volumes et caps sur la période sélectionnée",
     xaxis_title="Nombre de leads",
-    yaxis=dict(autorange="reversed"),
     height=320
 )
 
 status_counts = df["last_client_status"].fillna("no_status").value_counts()
-fig_status = px.pie(
-    names=status_counts.index,
-    values=status_counts.values,
+fig_status = pie_chart(
+    names=tuple(status_counts.index),
+    values=tuple(status_counts.values),
     title="Répartition des statuts des leads"
 )
 
@@ -160,18 +100,18 @@ df["statut_simplifié"] = df["last_client_status"].fillna("no_status").apply(
     lambda x: "Vente" if x.lower() == "sale" else "Non vendu"
 )
 transfo_counts = df["statut_simplifié"].value_counts()
-fig_transfo = px.pie(
-    names=transfo_counts.index,
-    values=transfo_counts.values,
+fig_transfo = pie_chart(
+    names=tuple(transfo_counts.index),
+    values=tuple(transfo_counts.values),
     title="Part des leads transformés (Sale) vs non transformés"
 )
 
-fig_line = px.line(
+fig_line = daily_line_chart(
     cap_par_jour.reset_index(),
     x="jour",
     y="daily_cap",
     title="Cap réel journalier (daily_cap par jour)",
-    markers=True
+    agg="max"
 )
 
 # === TABS ===
@@ -188,12 +128,15 @@ with tab1:
     st.dataframe(top_df, use_container_width=True)
     download_excel_button(top_df, filename="top10.xlsx", label="⬇️ Exporter les données en Excel")
     st.subheader("📌 Indicateurs clés")
-    col1, col2, col3, col4, col5 = st.columns(5)
-    col1.metric("🧾 Total leads", f"{kpis['total_leads']:,}")
-    col2.metric("💰 Revenu total (€)", f"{kpis['total_revenue']:,.2f}")
-    col3.metric("💸 Prix moyen / lead", f"{kpis['avg_price']:,.2f}")
-    col4.metric("📡 Sources uniques", kpis["unique_sources"])
-    col5.metric("🔥 Chaleur moyenne", formater_duree(kpis["avg_heat"]))
+    if comparison_mode != "Aucune":
+        show_comparison_kpis(comparison_kpis, previous_window)
+    else:
+        col1, col2, col3, col4, col5 = st.columns(5)
+        col1.metric("🧾 Total leads", f"{kpis['total_leads']:,}")
+        col2.metric("💰 Revenu total (€)", f"{kpis['total_revenue']:,.2f}")
+        col3.metric("💸 Prix moyen / lead", f"{kpis['avg_price']:,.2f}")
+        col4.metric("📡 Sources uniques", kpis["unique_sources"])
+        col5.metric("🔥 Chaleur moyenne", formater_duree(kpis["avg_heat"]))
 
     st.subheader("📊 Comparatif : Leads vs Cap réel et indicatif")
     st.plotly_chart(fig_bar, use_container_width=True)
@@ -222,13 +165,15 @@ with tab2:
 with tab3:
     st.subheader("📊 Statuts des leads")
     show_status_by_source_pivot(df)
+    if comparison_mode != "Aucune":
+        show_comparison_pivots(comparison_cube, sections=("statuts",))
 
 with tab4:
     st.subheader("🤖 Modèles de prédiction & outils exploratoires")
-    st.info("Section prévue pour ajouter des outils ou modèles à l’avenir.")
+    show_predicted_sale_rates(df)
 
 with tab5:
     st.subheader("📋 Données filtrées")
-    st.dataframe(df, use_container_width=True)
+    show_paginated_table(campaign_query_sql(campaign_where), params, key="campaign_data")
     download_excel_button(df, filename="leads_filtrés.xlsx", label="⬇️ Exporter les données en Excel")
 
@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
-from facebook_api import get_facebook_campaign_insights
+from datetime import date, timedelta
+from spend_store import get_daily_spend, spend_performance
+from data_loader import load_campaign_daily_revenue
 from utils import download_excel_button
 from page_config import set_dashboard_page_config
 
@@ -16,28 +18,59 @@ except KeyError:
     st.error("❌ Veuillez configurer votre fichier secrets.toml avec vos identifiants Facebook API.")
     st.stop()
 
-# Sélection période (Facebook utilise des presets, pas une plage personnalisée ici)
+# Sélection période : raccourcis ou plage personnalisée (les jours déjà stockés ne sont pas re-téléchargés)
+today = date.today()
+first_of_month = today.replace(day=1)
+last_month_end = first_of_month - timedelta(days=1)
 date_presets = {
-    "Aujourd'hui": "today",
-    "Hier": "yesterday",
-    "7 derniers jours": "last_7d",
-    "Ce mois-ci": "this_month",
-    "Mois dernier": "last_month"
+    "Aujourd'hui": (today, today),
+    "Hier": (today - timedelta(days=1), today - timedelta(days=1)),
+    "7 derniers jours": (today - timedelta(days=7), today - timedelta(days=1)),
+    "Ce mois-ci": (first_of_month, today),
+    "Mois dernier": (last_month_end.replace(day=1), last_month_end),
+    "Période personnalisée": None
 }
 selected_preset = st.selectbox("📅 Période", options=list(date_presets.keys()))
-preset_key = date_presets[selected_preset]
+if date_presets[selected_preset] is None:
+    custom_range = st.date_input("Plage de dates", (today - timedelta(days=30), today), max_value=today)
+    if len(custom_range) != 2:
+        st.info("Sélectionnez une date de début et une date de fin.")
+        st.stop()
+    since, until = custom_range
+else:
+    since, until = date_presets[selected_preset]
 
-# Appel API
-with st.spinner("🔄 Récupération des données Facebook..."):
+# Dépenses quotidiennes (stockage local + complément API)
+with st.spinner("🔄 Mise à jour des dépenses Facebook..."):
     try:
-        df_fb = get_facebook_campaign_insights(ad_account_id, access_token, date_preset=preset_key)
+        df_spend = get_daily_spend(ad_account_id, access_token, since, until)
     except Exception as e:
         st.error(f"Erreur lors de l'appel à l'API Facebook : {e}")
         st.stop()
 
 # Affichage
-if df_fb.empty:
+if df_spend.empty:
     st.warning("Aucune donnée trouvée pour la période sélectionnée.")
-else:
-    st.dataframe(df_fb, use_container_width=True)
-    download_excel_button(df_fb, filename="facebook_insights.xlsx", label="📥 Exporter Excel")
+    st.stop()
+
+df_revenue = load_campaign_daily_revenue(since, until)
+df_perf = spend_performance(df_spend, df_revenue)
+
+total_spend = df_perf["spend"].sum()
+total_leads = df_perf["leads"].sum()
+total_revenue = df_perf["revenue"].sum()
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("💸 Dépense (€)", f"{total_spend:,.2f}")
+col2.metric("🧾 Leads", f"{int(total_leads):,}")
+col3.metric("🎯 CPL (€)", f"{total_spend / total_leads:,.2f}" if total_leads else "–")
+col4.metric("📈 ROAS", f"{total_revenue / total_spend:,.2f}" if total_spend else "–")
+
+st.subheader("📊 Performance par campagne")
+st.caption("Dépenses Facebook rapprochées des leads de la base par nom de campagne.")
+st.dataframe(df_perf, use_container_width=True)
+download_excel_button(df_perf, filename="facebook_cpl_roas.xlsx", label="📥 Exporter Excel")
+
+with st.expander("📅 Dépenses quotidiennes"):
+    df_daily = df_spend.assign(date=pd.to_datetime(df_spend["date"]).dt.date).sort_values(["date", "campaign_name"])
+    st.dataframe(df_daily, use_container_width=True)
+    download_excel_button(df_daily, filename="facebook_insights.xlsx", label="📥 Exporter Excel (quotidien)")
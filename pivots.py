@@ -0,0 +1,78 @@
+import pandas as pd
+
+def catégoriser_délai(td):
+    minutes = td.total_seconds() / 60
+    if minutes < 5:
+        return "moins 5min"
+    elif minutes < 60:
+        return "entre 5min à 1h"
+    elif minutes < 600:
+        return "entre 1h à 10h"
+    elif minutes < 1440:
+        return "Leads de la veille"
+    else:
+        return "Leads de 2j"
+
+# Les pivots acceptent soit le frame des leads, soit le cube déjà agrégé par la base en mode agrégé
+# (`build_summary_cube_query` : colonnes source, statut, catégorie, jour et volume).
+def _is_cube(df):
+    return "volume" in df.columns
+
+def _volumes(df, keys):
+    if _is_cube(df):
+        return df.groupby(keys)["volume"].sum().reset_index(name="volume")
+    return df.groupby(keys).size().reset_index(name="volume")
+
+def status_counts(df):
+    if _is_cube(df):
+        return df.groupby("statut")["volume"].sum().sort_values(ascending=False)
+    return df["last_client_status"].fillna("no_status").value_counts()
+
+def daily_volume(df):
+    if _is_cube(df):
+        return df.groupby("jour", as_index=False)["volume"].sum()
+    df["jour"] = pd.to_datetime(df["lead_created_at"]).dt.date
+    return df.groupby("jour").agg(
+        volume=("lead_id", "count"),
+        revenu=("price_eur", "sum")
+    ).reset_index()
+
+# === Volume par jour et source ===
+def pivot_source_by_day(df):
+    if not _is_cube(df):
+        df["jour"] = pd.to_datetime(df["lead_created_at"]).dt.date
+        df["source"] = df["affiliate_name"].fillna("unknown")
+
+    grouped = _volumes(df, ["jour", "source"])
+    totals = grouped.groupby("jour")["volume"].transform("sum")
+    grouped["ventilation"] = (grouped["volume"] / totals * 100).round(0).astype(int)
+    grouped["cell"] = grouped["volume"].astype(str) + " – " + grouped["ventilation"].astype(str) + "%"
+
+    return grouped.pivot(index="source", columns="jour", values="cell").fillna("0 – 0%").sort_index()
+
+# === Fraîcheur des leads ===
+def pivot_lead_freshness(df):
+    if not _is_cube(df):
+        df["delai"] = pd.to_datetime(df["lead_created_at"]) - pd.to_datetime(df["registration_created_at"])
+        df["catégorie"] = df["delai"].apply(catégoriser_délai)
+        df["jour"] = pd.to_datetime(df["lead_created_at"]).dt.date
+
+    grouped = _volumes(df, ["jour", "catégorie"])
+    totals = grouped.groupby("jour")["volume"].transform("sum")
+    grouped["ventilation"] = (grouped["volume"] / totals * 100).round(0).astype(int)
+
+    grouped["cell"] = grouped["volume"].astype(str) + " (" + grouped["ventilation"].astype(str) + "%)"
+    return grouped.pivot(index="catégorie", columns="jour", values="cell").fillna("0 (0%)")
+
+# === Statuts par source ===
+def pivot_status_by_source(df):
+    if not _is_cube(df):
+        df["source"] = df["affiliate_name"].fillna("unknown")
+        df["statut"] = df["last_client_status"].fillna("no_status")
+
+    grouped = _volumes(df, ["source", "statut"])
+    totals = grouped.groupby("source")["volume"].transform("sum")
+    grouped["ventilation"] = (grouped["volume"] / totals * 100).round(0).astype(int)
+
+    grouped["cell"] = grouped["volume"].astype(str) + " (" + grouped["ventilation"].astype(str) + "%)"
+    return grouped.pivot(index="source", columns="statut", values="cell").fillna("0 (0%)")
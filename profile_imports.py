@@ -0,0 +1,111 @@
+"""
+Rapport du coût d'import des modules du dashboard (démarrage à froid).
+
+Chaque cible est importée dans un interpréteur neuf avec `python -X importtime` :
+on mesure le temps cumulé et on liste les dépendances les plus lourdes. Les cibles sont
+découvertes dans le dépôt : chaque module de premier niveau, et pour chaque script Streamlit
+(`app.py`, `pages/*.py`) l'ensemble des modules qu'il importe, c'est-à-dire son chemin à froid.
+
+Exemple :
+    python profile_imports.py --top 5
+"""
+import argparse
+import ast
+import glob
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# Scripts exécutés par Streamlit : ils ne sont pas importés, seuls leurs imports sont mesurés
+PAGE_SCRIPTS = ["app.py"] + sorted(os.path.relpath(path, ROOT) for path in glob.glob(os.path.join(ROOT, "pages", "*.py")))
+# Bibliothèques tierces mesurées seules, pour comparaison
+LIBRARIES = ["streamlit", "pandas", "sqlalchemy", "plotly.express", "plotly.graph_objects"]
+
+def repo_modules():
+    return sorted(
+        name[:-3] for name in os.listdir(ROOT)
+        if name.endswith(".py") and name not in PAGE_SCRIPTS and name != os.path.basename(__file__)
+    )
+
+def page_import_code(script):
+    """Instruction `import` regroupant tous les modules importés par un script (y compris les imports différés)."""
+    with open(os.path.join(ROOT, script), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            modules.append(node.module)
+    return "import " + ", ".join(dict.fromkeys(modules))
+
+def default_targets():
+    """[(libellé, code Python à exécuter)] : modules du dépôt, chemin à froid des pages, bibliothèques."""
+    targets = [(module, f"import {module}") for module in repo_modules()]
+    targets += [(script, page_import_code(script)) for script in PAGE_SCRIPTS]
+    targets += [(library, f"import {library}") for library in LIBRARIES]
+    return targets
+
+def _import_times(code):
+    """Exécute `code` dans un interpréteur neuf et renvoie [(temps cumulé ms, nom indenté)...]."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            # L'indentation du nom donne la profondeur d'import
+            imports.append((int(cumulative) / 1000, name[1:]))
+    return imports
+
+def profile_module(code, startup_modules):
+    """Renvoie (temps cumulé en ms, [(temps cumulé ms, sous-module)...]) pour un import à froid."""
+    imports = [
+        (ms, name) for ms, name in _import_times(code)
+        if name.strip() not in startup_modules
+    ]
+    total = sum(ms for ms, name in imports if not name.startswith(" "))
+    return total, imports
+
+def main():
+    parser = argparse.ArgumentParser(description="Profilage du temps d'import des modules du dashboard.")
+    parser.add_argument("modules", nargs="*", help="Modules à profiler (par défaut : tout le dépôt)")
+    parser.add_argument("--top", type=int, default=3, help="Nombre de dépendances les plus lourdes à afficher")
+    parser.add_argument("--repeat", type=int, default=1, help="Mesures par cible ; la mesure médiane est retenue")
+    args = parser.parse_args()
+
+    # Modules déjà chargés par l'interpréteur au démarrage, exclus des mesures
+    startup_modules = {name.strip() for _, name in _import_times("pass")}
+
+    targets = [(module, f"import {module}") for module in args.modules] or default_targets()
+    rows = []
+    for module, code in targets:
+        try:
+            runs = sorted((profile_module(code, startup_modules) for _ in range(args.repeat)), key=lambda run: run[0])
+            total, imports = runs[len(runs) // 2]
+        except RuntimeError as e:
+            print(f"❌ {module} : {e}")
+            continue
+        heaviest = sorted(
+            ((ms, name.strip()) for ms, name in imports if name.startswith(" ")),
+            reverse=True,
+        )[:args.top]
+        rows.append((total, module, heaviest))
+
+    print(f"{'module':<28}{'cumulé (ms)':>12}  dépendances les plus lourdes")
+    for total, module, heaviest in sorted(rows, reverse=True):
+        detail = ", ".join(f"{name} {ms:.0f}" for ms, name in heaviest)
+        print(f"{module:<28}{total:>12.1f}  {detail}")
+
+if __name__ == "__main__":
+    main()
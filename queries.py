@@ -1,7 +1,27 @@
-from sqlalchemy.sql import text
+import hashlib
+import re
 
-def build_main_query(where_clause: str):
-    return text(f"""
+def text(sql: str):
+    # Import différé : SQLAlchemy n'est chargé qu'au moment de construire une requête
+    from sqlalchemy.sql import text as sql_text
+    return sql_text(sql)
+
+def main_query_sql(where_clause: str, with_last_status: bool = True) -> str:
+    """
+    Requête V0. `with_last_status=False` omet la recherche du dernier statut client (une sonde
+    d'index par ligne) sans changer le nombre de lignes : c'est la base des comptages.
+    """
+    last_status_join = """
+    LEFT JOIN LATERAL (
+        -- Dernier statut du lead : un parcours d'index sur (lead_id, created_at) par lead
+        SELECT status
+        FROM lead_client_lead_status
+        WHERE lead_id = l.id
+        ORDER BY created_at DESC
+        LIMIT 1
+    ) lcls ON true""" if with_last_status else ""
+    last_status = "lcls.status" if with_last_status else "NULL::text"
+    return f"""
     SELECT
         s.id AS stat_id,
         cl.name AS client_name,
@@ -26,17 +46,339 @@ def build_main_query(where_clause: str):
         r.others::json->>'source' AS affiliate_name,
         r.others::json->>'aff_sub' AS aff_sub,
         r.others::json->>'publisher_id' AS publisher_id,
-        lcls.status AS last_client_status
+        {last_status} AS last_client_status
+    FROM stat s
+    JOIN registration r ON r.id = s.registration
+    LEFT JOIN lead l ON l.registration_id = r.id
+    LEFT JOIN campaign c ON c.id = l.campaign_id
+    LEFT JOIN vertical v ON c.vertical_id = v.id
+    LEFT JOIN client cl ON cl.id = s.client{last_status_join}
+    WHERE {where_clause}
+    """
+
+def build_main_query(where_clause: str):
+    return text(main_query_sql(where_clause))
+
+# Filtres V0 à forme fixe : une liste vide est passée à NULL (« tous »), si bien que toutes les
+# combinaisons de filtres partagent la même requête, préparée une fois par connexion.
+V0_FILTERS = """
+    (CAST(:clients AS bigint[]) IS NULL OR s.client = ANY(CAST(:clients AS bigint[])))
+    AND (CAST(:campaigns AS bigint[]) IS NULL OR c.id = ANY(CAST(:campaigns AS bigint[])))
+    AND (CAST(:verticals AS text[]) IS NULL OR v.name = ANY(CAST(:verticals AS text[])))
+    AND (CAST(:ads AS text[]) IS NULL OR s.aff_id = ANY(CAST(:ads AS text[])))
+    AND s.lead_created_at BETWEEN :start_date AND :end_date
+""".strip()
+
+def build_v0_filters(selections, start_date, end_date):
+    params = {
+        name: list(selections[name]) or None
+        for name in ("clients", "campaigns", "verticals", "ads")
+    }
+    params["start_date"] = start_date
+    params["end_date"] = end_date
+
+    return V0_FILTERS, params
+
+def campaign_query_sql(where_clause: str) -> str:
+    return f"""
+    SELECT
+        s.id AS stat_id,
+        cl.name AS client_name,
+        s.price_eur,
+        s.number_of_sales,
+        r.sold_to_exclusive,
+        s.currency,
+        v.name AS vertical_name,
+        c.name AS campaign_name,
+        c.daily_cap,
+        c.monthly_cap,
+        r.id AS registration_id,
+        l.id AS lead_id,
+        r.created_at AS registration_created_at,
+        s.lead_created_at,
+        r.firstname,
+        r.lastname,
+        r.zipcode,
+        r.city,
+        s.aff_id,
+        r.others::json->>'source' AS affiliate_name,
+        r.others::json->>'aff_sub' AS aff_sub,
+        l.last_lead_client_status AS last_client_status
     FROM stat s
     JOIN registration r ON r.id = s.registration
     LEFT JOIN lead l ON l.registration_id = r.id
     LEFT JOIN campaign c ON c.id = l.campaign_id
     LEFT JOIN vertical v ON c.vertical_id = v.id
     LEFT JOIN client cl ON cl.id = s.client
-    LEFT JOIN (
-        SELECT DISTINCT ON (lead_id) lead_id, status
+    WHERE {where_clause}
+    """
+
+def build_campaign_query(where_clause: str):
+    return text(campaign_query_sql(where_clause))
+
+def build_top_campaigns_query():
+    return text("""
+        SELECT 
+            c.name AS campaign_name, 
+            COUNT(DISTINCT s.id) AS total_leads, 
+            SUM(s.price_eur) AS total_revenue, 
+            ROUND(AVG(s.price_eur)::numeric, 2) AS avg_price
+        FROM stat s
+        JOIN registration r ON r.id = s.registration
+        LEFT JOIN lead l ON l.registration_id = r.id
+        LEFT JOIN campaign c ON c.id = l.campaign_id
+        WHERE s.lead_created_at BETWEEN :start_date AND :end_date
+        GROUP BY c.name
+        ORDER BY total_revenue DESC
+        LIMIT 10
+    """)
+
+def build_campaign_names_query():
+    return text("""
+            SELECT DISTINCT name FROM campaign
+            WHERE name IS NOT NULL
+            AND (
+                CAST(:statuses AS text[]) IS NULL
+                OR status = ANY(CAST(:statuses AS text[]))
+                OR (CAST(:include_null AS boolean) AND status IS NULL)
+            )
+            ORDER BY name
+        """)
+
+def campaign_names_params(selected_statuses):
+    """Aucun statut sélectionné : toutes les campagnes ; 'NULL' désigne les campagnes sans statut."""
+    return {
+        "statuses": [status for status in selected_statuses if status != "NULL"] if selected_statuses else None,
+        "include_null": "NULL" in selected_statuses,
+    }
+
+# === Pagination (keyset sur stat_id, lead_id) ===
+# Les colonnes triables doivent être non nulles pour que la comparaison de lignes reste exacte.
+SORT_EXPRESSIONS = {
+    "lead_created_at": "q.lead_created_at",
+    "stat_id": "q.stat_id",
+    "price_eur": "COALESCE(q.price_eur, 0)",
+}
+
+# stat_id n'est pas unique : une inscription peut porter plusieurs leads (jointure lead 1-n)
+LEAD_TIEBREAK = "COALESCE(q.lead_id, 0)"
+
+# Colonnes filtrables de la grille paginée (libellés dans data_grid.FILTER_COLUMNS)
+GRID_FILTER_COLUMNS = (
+    "client_name", "campaign_name", "vertical_name", "affiliate_name", "aff_id", "zipcode", "last_client_status",
+)
+
+# Forme fixe : toutes les colonnes filtrables et le curseur sont toujours présents, un paramètre NULL
+# désactivant le filtre (ou le curseur de la première page). Une grille n'a ainsi qu'une requête par tri.
+def _grid_filters_sql(filter_columns):
+    return "".join(
+        f" AND (CAST(:_f_{col} AS text) IS NULL OR q.{col}::text ILIKE :_f_{col})" for col in filter_columns
+    )
+
+def build_page_query(base_sql: str, sort_key: str, descending: bool, filter_columns=()):
+    sort_expr = SORT_EXPRESSIONS[sort_key]
+    direction = "DESC" if descending else "ASC"
+    op = "<" if descending else ">"
+    keyset = (
+        f" AND (CAST(:_after_id AS bigint) IS NULL"
+        f" OR ({sort_expr}, q.stat_id, {LEAD_TIEBREAK}) {op} (:_after_sort, :_after_id, :_after_lead_id))"
+    )
+    return text(f"""
+    SELECT q.* FROM ({base_sql}) q
+    WHERE 1=1{_grid_filters_sql(filter_columns)}{keyset}
+    ORDER BY {sort_expr} {direction}, q.stat_id {direction}, {LEAD_TIEBREAK} {direction}
+    LIMIT :_limit
+    """)
+
+def build_count_query(base_sql: str, filter_columns=()) -> str:
+    # Postgres n'élimine que les LEFT JOIN sur clé unique (campagne, verticale, client) : la jointure
+    # lead (1-n) reste nécessaire, et une éventuelle recherche LATERAL du statut est exécutée par ligne.
+    # Passer `main_query_sql(..., with_last_status=False)` quand aucun filtre ne porte sur le statut.
+    return f"""
+    SELECT COUNT(*) AS total FROM ({base_sql}) q
+    WHERE 1=1{_grid_filters_sql(filter_columns)}
+    """
+
+# === Mode live (delta depuis le dernier watermark) ===
+def build_live_delta_query(where_clause: str):
+    return build_main_query(
+        f"({where_clause}) AND (s.id > :last_stat_id OR s.lead_created_at > :last_lead_created_at)"
+    )
+
+def build_status_changes_query():
+    return text("""
+    SELECT DISTINCT ON (lead_id) lead_id, status, created_at
+    FROM lead_client_lead_status
+    WHERE created_at > :since
+    ORDER BY lead_id, created_at DESC
+    """)
+
+# === Revenu des leads par campagne et par jour (page Dépenses) ===
+def build_campaign_daily_revenue_query():
+    return text("""
+    SELECT
+        s.lead_created_at::date AS date,
+        c.name AS campaign_name,
+        COUNT(*) AS leads,
+        SUM(s.price_eur) AS revenue
+    FROM stat s
+    JOIN registration r ON r.id = s.registration
+    LEFT JOIN lead l ON l.registration_id = r.id
+    LEFT JOIN campaign c ON c.id = l.campaign_id
+    WHERE s.lead_created_at >= :start_date AND s.lead_created_at < :end_date
+    GROUP BY 1, 2
+    """)
+
+# === Comparaison de périodes (une seule requête : KPIs et cube des deux périodes) ===
+# `base_sql` est lu deux fois dans la même requête, chaque lecture bornée à sa période (ses paramètres
+# :start_date / :end_date deviennent :current_* et :previous_*) : l'écart entre les deux périodes n'est
+# jamais parcouru, et une ligne commune à deux périodes qui se chevauchent compte dans chacune.
+COMPARISON_KPIS = {
+    "total_leads": "COUNT(*)",
+    "total_revenue": "COALESCE(SUM(q.price_eur), 0)",
+    "avg_price": "AVG(q.price_eur)",
+    "unique_sources": "COUNT(DISTINCT q.affiliate_name)",
+    "avg_heat": "AVG(q.lead_created_at - q.registration_created_at)",
+    "nb_registrations": "COUNT(DISTINCT q.registration_id)",
+    "nb_leads": "COUNT(q.lead_id)",
+    "sold": "COUNT(*) FILTER (WHERE COALESCE(q.number_of_sales, 0) > 0)",
+    "exclusive": "COUNT(*) FILTER (WHERE q.sold_to_exclusive)",
+}
+
+# Dimensions des tableaux croisés (mêmes libellés que pivots.catégoriser_délai)
+CUBE_DIMENSIONS = """
+        COALESCE(q.affiliate_name, 'unknown') AS source,
+        COALESCE(q.last_client_status, 'no_status') AS statut,
+        CASE
+            WHEN q.lead_created_at - q.registration_created_at < interval '5 minutes' THEN 'moins 5min'
+            WHEN q.lead_created_at - q.registration_created_at < interval '1 hour' THEN 'entre 5min à 1h'
+            WHEN q.lead_created_at - q.registration_created_at < interval '10 hours' THEN 'entre 1h à 10h'
+            WHEN q.lead_created_at - q.registration_created_at < interval '1 day' THEN 'Leads de la veille'
+            ELSE 'Leads de 2j'
+        END AS "catégorie"
+""".strip()
+
+def _period_rows_sql(base_sql: str, period: str) -> str:
+    bounded = re.sub(r"(?<![:\w]):start_date\b", f":{period}_start", base_sql)
+    bounded = re.sub(r"(?<![:\w]):end_date\b", f":{period}_end", bounded)
+    return f"""
+        SELECT q.*, CAST('{period}' AS text) AS period, CAST(:{period}_start AS date) AS period_start
+        FROM ({bounded}) q"""
+
+def build_comparison_query(base_sql: str):
+    """
+    Une ligne de totaux par période (`is_total`, colonnes de COMPARISON_KPIS) et une ligne par
+    période × source × statut × fraîcheur × jour de la période (`jour_index`, `volume`).
+    """
+    kpis = ",\n        ".join(f"{aggregate} AS {name}" for name, aggregate in COMPARISON_KPIS.items())
+    return text(f"""
+    SELECT
+        q.period,
+        GROUPING(q.source) = 1 AS is_total,
+        q.source,
+        q.statut,
+        q."catégorie",
+        q.jour_index,
+        COUNT(*) AS volume,
+        {kpis}
+    FROM (
+        SELECT
+            q.*,
+            {CUBE_DIMENSIONS},
+            q.lead_created_at::date - q.period_start AS jour_index
+        FROM ({_period_rows_sql(base_sql, "current")}
+        UNION ALL{_period_rows_sql(base_sql, "previous")}
+        ) q
+    ) q
+    GROUP BY GROUPING SETS (
+        (q.period),
+        (q.period, q.source, q.statut, q."catégorie", q.jour_index)
+    )
+    """)
+
+# === Mode agrégé (résultat trop volumineux pour être chargé) ===
+SUMMARY_AGGREGATES = dict(
+    COMPARISON_KPIS,
+    not_exclusive="COUNT(*) FILTER (WHERE NOT q.sold_to_exclusive)",
+    daily_cap_total="COALESCE(SUM(q.daily_cap), 0)",
+    has_daily="COUNT(q.daily_cap) > 0",
+    monthly_cap_total="COALESCE(SUM(q.monthly_cap), 0)",
+    has_monthly="COUNT(q.monthly_cap) > 0",
+)
+
+def build_summary_query(base_sql: str):
+    columns = ",\n        ".join(f"{aggregate} AS {name}" for name, aggregate in SUMMARY_AGGREGATES.items())
+    return text(f"""
+    SELECT
+        {columns}
+    FROM ({base_sql}) q
+    """)
+
+def build_summary_cube_query(base_sql: str):
+    return text(f"""
+    SELECT
+        {CUBE_DIMENSIONS},
+        q.lead_created_at::date AS jour,
+        COUNT(*) AS volume
+    FROM ({base_sql}) q
+    GROUP BY 1, 2, 3, 4
+    """)
+
+# === Scoring des leads (onglet Modèles & outils) ===
+def build_status_watermark_query():
+    return text("SELECT MAX(created_at) AS watermark FROM lead_client_lead_status")
+
+def build_first_status_query():
+    return text("SELECT MIN(created_at) AS first_status FROM lead_client_lead_status")
+
+def build_training_query():
+    return text("""
+    SELECT
+        l.id AS lead_id,
+        s.aff_id,
+        r.others::json->>'source' AS affiliate_name,
+        v.name AS vertical_name,
+        r.zipcode,
+        r.created_at AS registration_created_at,
+        s.lead_created_at,
+        lcls.status AS last_client_status
+    FROM (
+        SELECT DISTINCT ON (lead_id) lead_id, status, created_at
         FROM lead_client_lead_status
+        WHERE created_at > :since AND created_at <= :until
         ORDER BY lead_id, created_at DESC
-    ) lcls ON lcls.lead_id = l.id
-    WHERE {where_clause}
-    """)
\ No newline at end of file
+    ) lcls
+    JOIN lead l ON l.id = lcls.lead_id
+    JOIN registration r ON r.id = l.registration_id
+    -- Une seule ligne par lead : une inscription vendue à plusieurs clients a plusieurs stats
+    JOIN LATERAL (
+        SELECT aff_id, lead_created_at
+        FROM stat
+        WHERE registration = r.id
+        ORDER BY lead_created_at, id
+        LIMIT 1
+    ) s ON true
+    LEFT JOIN campaign c ON c.id = l.campaign_id
+    LEFT JOIN vertical v ON v.id = c.vertical_id
+    WHERE lcls.status = ANY(CAST(:final_statuses AS text[]))
+    """)
+
+# === Requêtes préparées (PREPARE / EXECUTE) ===
+_BIND_PARAM = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+
+def prepared_statement(sql: str):
+    """
+    Convertit une requête à paramètres nommés (`:nom`) pour PREPARE.
+
+    Returns:
+        tuple: (nom de la requête préparée, dérivé du texte SQL ; SQL à paramètres positionnels `$n` ;
+            noms des paramètres dans l'ordre de `$1..$n`)
+    """
+    names = list(dict.fromkeys(_BIND_PARAM.findall(sql)))
+    statement = f"dashboard_{hashlib.sha1(sql.encode()).hexdigest()[:16]}"
+    positional_sql = _BIND_PARAM.sub(lambda m: f"${names.index(m.group(1)) + 1}", sql)
+    return statement, positional_sql, names
+
+def execute_sql(statement: str, names) -> str:
+    arguments = f"({', '.join(f':{name}' for name in names)})" if names else ""
+    return f"EXECUTE {statement}{arguments}"
@@ -0,0 +1,161 @@
+"""
+Prédiction de l'issue des leads (vente ou non) à partir de leurs caractéristiques d'acquisition.
+
+Le modèle est un Naive Bayes catégoriel : il ne stocke que des comptes par valeur de variable et
+par issue, ce qui permet de l'entraîner par incréments (seuls les statuts postérieurs au dernier
+watermark sont lus) et de scorer un frame entier en quelques opérations vectorisées.
+Un lead dont le statut final change après coup est compté une seconde fois ; l'effet reste
+négligeable tant que ces corrections sont rares.
+"""
+import glob
+import multiprocessing
+import os
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+MODEL_DIR = "models"
+FEATURES = ["source", "aff_id", "vertical", "delai", "heure", "departement"]
+# Seules colonnes lues par build_features : le reste du frame n'est pas envoyé aux processus
+SCORING_COLUMNS = ["affiliate_name", "aff_id", "vertical_name", "lead_created_at", "registration_created_at", "zipcode"]
+# Lissage de Laplace des comptes
+ALPHA = 1.0
+# Au-delà, le scoring est réparti sur un pool de processus
+PARALLEL_MIN_ROWS = 200_000
+SCORING_CHUNKS = 8
+# Taille des tranches d'historique lues à l'entraînement
+TRAINING_SLICE = relativedelta(months=1)
+
+DELAI_BINS = [-np.inf, 5, 60, 600, 1440, np.inf]
+DELAI_LABELS = ["moins 5min", "entre 5min à 1h", "entre 1h à 10h", "Leads de la veille", "Leads de 2j"]
+
+def build_features(df):
+    """Variables catégorielles du modèle, calculées sans boucle sur les lignes."""
+    lead_created_at = pd.to_datetime(df["lead_created_at"])
+    delay_minutes = (lead_created_at - pd.to_datetime(df["registration_created_at"])).dt.total_seconds() / 60
+    delai = pd.cut(delay_minutes, bins=DELAI_BINS, labels=DELAI_LABELS, right=False)
+
+    return pd.DataFrame({
+        "source": df["affiliate_name"].fillna("unknown").astype(str),
+        "aff_id": df["aff_id"].fillna("unknown").astype(str),
+        "vertical": df["vertical_name"].fillna("unknown").astype(str),
+        "delai": delai.astype(str).replace("nan", "inconnu"),
+        "heure": lead_created_at.dt.hour.astype("Int64").astype(str).replace("<NA>", "inconnu"),
+        "departement": df["zipcode"].fillna("").astype(str).str.strip().str[:2].replace("", "inconnu"),
+    }, index=df.index)
+
+def new_model():
+    return {
+        "watermark": None,
+        "class_counts": np.zeros(2),
+        "counts": {feature: pd.DataFrame(columns=[0, 1], dtype=float) for feature in FEATURES},
+    }
+
+def update_model(model, features, is_sale):
+    """Ajoute au modèle les comptes d'un lot d'issues connues (entraînement incrémental)."""
+    target = is_sale.astype(int)
+    model["class_counts"] += np.bincount(target, minlength=2)
+    for feature in FEATURES:
+        batch = pd.crosstab(features[feature], target).reindex(columns=[0, 1], fill_value=0)
+        model["counts"][feature] = model["counts"][feature].add(batch, fill_value=0)
+    return model
+
+def predict_sale_proba(model, features):
+    """Probabilité de vente de chaque lead ; 0.5 tant que le modèle n'a vu aucune issue."""
+    class_counts = model["class_counts"]
+    if class_counts.sum() == 0:
+        return pd.Series(0.5, index=features.index)
+
+    log_odds = np.log((class_counts[1] + ALPHA) / (class_counts[0] + ALPHA))
+    for feature in FEATURES:
+        counts = model["counts"][feature]
+        # Une valeur jamais vue ne reçoit que le lissage
+        denominators = class_counts + ALPHA * (len(counts) + 1)
+        sale = features[feature].map(counts[1]).fillna(0).to_numpy(dtype=float)
+        no_sale = features[feature].map(counts[0]).fillna(0).to_numpy(dtype=float)
+        log_odds = log_odds + np.log((sale + ALPHA) / denominators[1]) - np.log((no_sale + ALPHA) / denominators[0])
+
+    return pd.Series(1 / (1 + np.exp(-log_odds)), index=features.index)
+
+def _score_chunk(model, chunk):
+    return predict_sale_proba(model, build_features(chunk))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _scoring_pool():
+    """Pool créé au premier gros scoring puis réutilisé : les processus n'importent pandas qu'une fois."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn : le serveur Streamlit est multi-thread, un fork pourrait hériter d'un verrou tenu
+            _pool = ProcessPoolExecutor(max_workers=SCORING_CHUNKS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def score_leads(model, df):
+    """Score un frame en lot ; les gros frames sont découpés et scorés dans un pool de processus."""
+    df = df[SCORING_COLUMNS]
+    if len(df) < PARALLEL_MIN_ROWS:
+        return _score_chunk(model, df)
+
+    bounds = np.linspace(0, len(df), SCORING_CHUNKS + 1, dtype=int)
+    chunks = [df.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+    scores = list(_scoring_pool().map(_score_chunk, [model] * len(chunks), chunks))
+    return pd.concat(scores)
+
+# === Cache disque par watermark ===
+def _model_path(watermark):
+    return os.path.join(MODEL_DIR, f"lead_outcome_{watermark:%Y%m%dT%H%M%S%f}.pkl")
+
+def _latest_saved_model():
+    paths = sorted(glob.glob(os.path.join(MODEL_DIR, "lead_outcome_*.pkl")))
+    if not paths:
+        return None
+    with open(paths[-1], "rb") as f:
+        return pickle.load(f)
+
+def _save_model(model):
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    path = _model_path(model["watermark"])
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(model, f)
+    os.replace(tmp_path, path)
+    # Seul le modèle le plus récent est conservé
+    for old_path in glob.glob(os.path.join(MODEL_DIR, "lead_outcome_*.pkl")):
+        if old_path != path:
+            os.remove(old_path)
+
+def refresh_model(watermark, load_training_frame, is_sale, load_first_status):
+    """
+    Renvoie le modèle entraîné jusqu'à `watermark` en ne lisant que les issues postérieures
+    au dernier modèle enregistré sur disque.
+
+    Args:
+        watermark (datetime): Date du statut client le plus récent en base.
+        load_training_frame (callable): (since, until) -> pd.DataFrame des leads à issue définitive.
+        is_sale (callable): pd.Series de statuts -> pd.Series booléenne.
+        load_first_status (callable): () -> datetime du plus ancien statut client (entraînement à froid).
+    """
+    model = _latest_saved_model() or new_model()
+    if model["watermark"] is not None and model["watermark"] >= watermark:
+        return model
+
+    # Tranches mensuelles : un entraînement à froid ne charge jamais tout l'historique d'un coup,
+    # et chaque tranche est enregistrée pour qu'un entraînement interrompu reprenne où il s'est arrêté.
+    # Borne basse exclusive : le plus ancien statut est inclus dans la première tranche
+    since = model["watermark"] or load_first_status() - timedelta(seconds=1)
+    while since < watermark:
+        until = min(since + TRAINING_SLICE, watermark)
+        training = load_training_frame(since, until)
+        if not training.empty:
+            update_model(model, build_features(training), is_sale(training["last_client_status"]))
+        model["watermark"] = until
+        _save_model(model)
+        since = until
+    return model
@@ -0,0 +1,113 @@
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+from facebook_api import get_facebook_daily_insights
+
+SPEND_STORE_DIR = "data"
+SPEND_STORE_PATH = os.path.join(SPEND_STORE_DIR, "facebook_spend_daily.parquet")
+FETCHED_DAYS_PATH = os.path.join(SPEND_STORE_DIR, "facebook_spend_days.parquet")
+
+# Facebook révise encore les dépenses des derniers jours (attribution, facturation)
+MUTABLE_DAYS = 3
+# Délai minimal avant de relire un jour encore modifiable
+MUTABLE_REFRESH = timedelta(hours=1)
+
+SPEND_COLUMNS = ["date", "campaign_id", "campaign_name", "spend", "impressions", "clicks"]
+
+_store_lock = threading.Lock()
+
+def _read_parquet(path, columns):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=columns)
+    return pd.read_parquet(path)
+
+def _write_parquet(df, path):
+    # Écriture atomique : un lecteur ne voit jamais un fichier partiel
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def _days_to_fetch(fetched_days, since, until, now):
+    fetched_at = dict(zip(pd.to_datetime(fetched_days["date"]).dt.date, pd.to_datetime(fetched_days["fetched_at"])))
+    to_fetch = []
+    day = since
+    while day <= until:
+        last_fetch = fetched_at.get(day)
+        # Un jour relu après sa fenêtre de révision est définitif
+        still_mutable = last_fetch is not None and last_fetch.date() <= day + timedelta(days=MUTABLE_DAYS)
+        if last_fetch is None or (still_mutable and now - last_fetch > MUTABLE_REFRESH):
+            to_fetch.append(day)
+        day += timedelta(days=1)
+    return to_fetch
+
+def _contiguous_ranges(days):
+    ranges = []
+    for day in days:
+        if ranges and ranges[-1][1] + timedelta(days=1) == day:
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return ranges
+
+def get_daily_spend(ad_account_id, access_token, since, until):
+    """
+    Renvoie les dépenses quotidiennes par campagne entre `since` et `until` (inclus).
+    Seuls les jours jamais chargés ou encore modifiables sont demandés à l'API Facebook,
+    par plages contiguës ; le reste est lu depuis le stockage Parquet local.
+    """
+    until = min(until, date.today())
+    with _store_lock:
+        spend = _read_parquet(SPEND_STORE_PATH, SPEND_COLUMNS)
+        fetched_days = _read_parquet(FETCHED_DAYS_PATH, ["date", "fetched_at"])
+        now = datetime.now()
+        days = _days_to_fetch(fetched_days, since, until, now)
+
+        if days:
+            fetched = [
+                get_facebook_daily_insights(ad_account_id, access_token, start, end)
+                for start, end in _contiguous_ranges(days)
+            ]
+            refreshed = pd.to_datetime(pd.Series(days))
+            spend = pd.concat(
+                [spend[~pd.to_datetime(spend["date"]).isin(refreshed)]] + fetched,
+                ignore_index=True
+            )[SPEND_COLUMNS]
+            fetched_days = pd.concat([
+                fetched_days[~pd.to_datetime(fetched_days["date"]).isin(refreshed)],
+                pd.DataFrame({"date": refreshed, "fetched_at": now}),
+            ], ignore_index=True)
+            _write_parquet(spend, SPEND_STORE_PATH)
+            _write_parquet(fetched_days, FETCHED_DAYS_PATH)
+
+    spend["date"] = pd.to_datetime(spend["date"])
+    in_range = (spend["date"] >= pd.Timestamp(since)) & (spend["date"] <= pd.Timestamp(until))
+    return spend[in_range].reset_index(drop=True)
+
+def _campaign_key(names):
+    return names.fillna("").str.strip().str.lower()
+
+def spend_performance(spend, revenue):
+    """
+    Agrège dépenses et revenus de leads par campagne et calcule CPL et ROAS.
+    La jointure se fait sur le nom de campagne (seule clé commune entre Facebook et la base).
+    """
+    spend_by_campaign = spend.groupby("campaign_name", as_index=False).agg(
+        spend=("spend", "sum"),
+        impressions=("impressions", "sum"),
+        clicks=("clicks", "sum")
+    )
+    spend_by_campaign["key"] = _campaign_key(spend_by_campaign["campaign_name"])
+
+    revenue_by_campaign = revenue.assign(key=_campaign_key(revenue["campaign_name"])).groupby("key", as_index=False).agg(
+        leads=("leads", "sum"),
+        revenue=("revenue", "sum")
+    )
+
+    perf = spend_by_campaign.merge(revenue_by_campaign, on="key", how="left").drop(columns="key")
+    perf[["leads", "revenue"]] = perf[["leads", "revenue"]].fillna(0)
+    perf["cpl"] = perf["spend"] / perf["leads"].where(perf["leads"] > 0)
+    perf["roas"] = perf["revenue"] / perf["spend"].where(perf["spend"] > 0)
+    return perf.sort_values("spend", ascending=False).reset_index(drop=True)
@@ -22,10 +22,42 @@ def formater_duree(td):
     minutes, _ = divmod(reste, 60)
     return f"{jours}j {heures}h {minutes}m"
 
-import streamlit as st
-import io
+STATUTS_CLIENTS = {
+    "Sale": "Vente",
+    "Visit": "En cours",
+    "Uncalled": "En cours",
+    "Call Again": "En cours",
+    "Not Interested": "Refus",
+    "Duplicate": "Doublon",
+    "Wrong Phone": "Inéligible",
+    "Fake Phone": "Inéligible",
+    "Unreachable": "Inéligible",
+    "Not Cooperating": "Inéligible",
+    "Existing Client": "Hors cible",
+    "Out of Target": "Hors cible",
+    "Out of Geo": "Hors cible",
+    "Out of Age": "Hors cible",
+    "Out Of Eligible": "Hors cible"
+}
+
+# Statuts définitifs : décision du client prise, utilisables comme issue d'un lead
+STATUTS_FINAUX = [statut for statut, categorie in STATUTS_CLIENTS.items() if categorie != "En cours"]
+
+def mapper_statuts_clients(statut):
+    return STATUTS_CLIENTS.get(statut, "Autre")
+
+def to_sql_param(value):
+    # psycopg2 ne sait pas adapter les scalaires numpy / pandas
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if hasattr(value, "item"):
+        return value.item()
+    return value
 
 def download_excel_button(df: pd.DataFrame, filename: str = "export.xlsx", label: str = "📥 Télécharger Excel"):
+    import io
+    import streamlit as st
+
     buffer = io.BytesIO()
     with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
         df.to_excel(writer, index=False)
@@ -1,17 +1,16 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from utils import formater_duree, download_excel_button
+from charts import daily_bar_chart
+from data_loader import load_status_watermark, load_lead_outcome_model
+from scoring import score_leads
+from pivots import daily_volume, pivot_source_by_day, pivot_lead_freshness, pivot_status_by_source
 
 # === Chart: Volume de leads par jour ===
 def show_leads_volume_chart(df):
-    df["jour"] = pd.to_datetime(df["lead_created_at"]).dt.date
-    evol_data = df.groupby("jour").agg(
-        volume=("lead_id", "count"),
-        revenu=("price_eur", "sum")
-    ).reset_index()
+    evol_data = daily_volume(df)
 
-    fig = px.bar(
+    fig = daily_bar_chart(
         evol_data,
         x="jour",
         y="volume",
@@ -30,15 +29,7 @@ def show_source_by_day_pivot(df):
         st.info("Aucune donnée disponible pour les filtres sélectionnés.")
         return
 
-    df["jour"] = pd.to_datetime(df["lead_created_at"]).dt.date
-    df["source"] = df["affiliate_name"].fillna("unknown")
-
-    grouped = df.groupby(["jour", "source"]).size().reset_index(name="volume")
-    totals = grouped.groupby("jour")["volume"].transform("sum")
-    grouped["ventilation"] = (grouped["volume"] / totals * 100).round(0).astype(int)
-    grouped["cell"] = grouped["volume"].astype(str) + " – " + grouped["ventilation"].astype(str) + "%"
-
-    pivot = grouped.pivot(index="source", columns="jour", values="cell").fillna("0 – 0%").sort_index()
+    pivot = pivot_source_by_day(df)
 
     st.dataframe(pivot, use_container_width=True)
     download_excel_button(
@@ -55,30 +46,7 @@ def show_lead_freshness_pivot(df):
         st.info("Aucune donnée disponible pour les filtres sélectionnés.")
         return
 
-    df["delai"] = pd.to_datetime(df["lead_created_at"]) - pd.to_datetime(df["registration_created_at"])
-
-    def catégoriser_délai(td):
-        minutes = td.total_seconds() / 60
-        if minutes < 5:
-            return "moins 5min"
-        elif minutes < 60:
-            return "entre 5min à 1h"
-        elif minutes < 600:
-            return "entre 1h à 10h"
-        elif minutes < 1440:
-            return "Leads de la veille"
-        else:
-            return "Leads de 2j"
-
-    df["catégorie"] = df["delai"].apply(catégoriser_délai)
-    df["jour"] = pd.to_datetime(df["lead_created_at"]).dt.date
-
-    grouped = df.groupby(["jour", "catégorie"]).size().reset_index(name="volume")
-    totals = grouped.groupby("jour")["volume"].transform("sum")
-    grouped["ventilation"] = (grouped["volume"] / totals * 100).round(0).astype(int)
-
-    grouped["cell"] = grouped["volume"].astype(str) + " (" + grouped["ventilation"].astype(str) + "%)"
-    pivot = grouped.pivot(index="catégorie", columns="jour", values="cell").fillna("0 (0%)")
+    pivot = pivot_lead_freshness(df)
 
     st.dataframe(pivot, use_container_width=True)
     download_excel_button(
@@ -95,15 +63,7 @@ def show_status_by_source_pivot(df):
         st.info("Aucune donnée disponible pour les filtres sélectionnés.")
         return
 
-    df["source"] = df["affiliate_name"].fillna("unknown")
-    df["statut"] = df["last_client_status"].fillna("no_status")
-
-    grouped = df.groupby(["source", "statut"]).size().reset_index(name="volume")
-    totals = grouped.groupby("source")["volume"].transform("sum")
-    grouped["ventilation"] = (grouped["volume"] / totals * 100).round(0).astype(int)
-
-    grouped["cell"] = grouped["volume"].astype(str) + " (" + grouped["ventilation"].astype(str) + "%)"
-    pivot = grouped.pivot(index="source", columns="statut", values="cell").fillna("0 (0%)")
+    pivot = pivot_status_by_source(df)
 
     st.dataframe(pivot, use_container_width=True)
     download_excel_button(
@@ -111,3 +71,40 @@ def show_status_by_source_pivot(df):
         filename="statuts_par_source.xlsx",
         label="📥 Télécharger le tableau des statuts (Excel)"
     )
+
+# === Table: Taux de vente prédit par source ===
+def show_predicted_sale_rates(df):
+    st.header("🤖 Taux de vente prédit par source")
+
+    if df.empty:
+        st.info("Aucune donnée disponible pour les filtres sélectionnés.")
+        return
+
+    watermark = load_status_watermark()
+    if watermark is None:
+        st.info("Aucun statut client historique : le modèle ne peut pas encore être entraîné.")
+        return
+
+    model = load_lead_outcome_model(watermark)
+    scored = pd.DataFrame({
+        "source": df["affiliate_name"].fillna("unknown"),
+        "proba_vente": score_leads(model, df),
+        "vendu": df["last_client_status"].fillna("no_status") == "Sale",
+    })
+    table = scored.groupby("source").agg(
+        leads=("proba_vente", "size"),
+        taux_vente_predit=("proba_vente", "mean"),
+        taux_vente_observe=("vendu", "mean")
+    ).sort_values("leads", ascending=False)
+    table[["taux_vente_predit", "taux_vente_observe"]] = (table[["taux_vente_predit", "taux_vente_observe"]] * 100).round(1)
+
+    st.caption(
+        f"Modèle entraîné sur {int(model['class_counts'].sum()):,} leads à statut définitif "
+        f"(statuts jusqu'au {watermark:%d/%m/%Y %H:%M}). Taux en %."
+    )
+    st.dataframe(table, use_container_width=True)
+    download_excel_button(
+        df=table.reset_index(),
+        filename="taux_vente_predit_par_source.xlsx",
+        label="📥 Télécharger les prédictions (Excel)"
+    )